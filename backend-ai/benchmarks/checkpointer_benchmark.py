@@ -0,0 +1,101 @@
+"""
+Measures the API process memory (RSS) over many chat turns with the in-memory and the
+Redis checkpointer. Turns run through a one-node graph with the same message reducer
+as the chat workflow, round-robin over a number of users, and RSS is sampled at fixed
+intervals. With the Redis checkpointer it should stay flat, since the conversation
+state lives in Redis and only the last CHECKPOINT_RETENTION checkpoints are kept.
+
+Needs the Redis server of the API for '--checkpointer redis'. Benchmark threads are
+deleted afterwards.
+
+Usage (from backend-ai/):
+    python -m benchmarks.checkpointer_benchmark --checkpointer redis --turns 100000
+"""
+
+import argparse
+import asyncio
+import resource
+import time
+from operator import add
+from typing import Annotated, List
+from typing_extensions import TypedDict
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import StateGraph, START, END
+from src.db.checkpointer import checkpoint_saver
+
+ANSWER = "A typical answer of the assistant, a few sentences long. " * 8
+
+
+class BenchmarkState(TypedDict):
+    user_query: str
+    messages: Annotated[List, add]
+
+
+async def answer(state: BenchmarkState) -> BenchmarkState:
+    state["messages"] = [
+        {"role": "user", "content": state["user_query"]},
+        {"role": "assistant", "content": ANSWER},
+    ]
+    return state
+
+
+def rss_mb() -> float:
+    """
+    Returns the current resident set size of the process in MB.
+    """
+
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize() / 2**20
+    except OSError:
+        # Peak RSS where /proc is not available (KB on Linux, bytes on macOS).
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+
+
+async def run(checkpointer: BaseCheckpointSaver, turns: int, users: int, samples: int) -> None:
+    workflow = StateGraph(BenchmarkState)
+    workflow.add_node("answer", answer)
+    workflow.add_edge(START, "answer")
+    workflow.add_edge("answer", END)
+    graph = workflow.compile(checkpointer=checkpointer)
+
+    interval = max(turns // samples, 1)
+    start = time.perf_counter()
+    print(f"{'turns':>8} {'rss (MB)':>10} {'turns/s':>9}")
+    for turn in range(1, turns + 1):
+        config = {"configurable": {"thread_id": f"checkpointer-benchmark-{turn % users}"}}
+        await graph.ainvoke({"user_query": f"Question number {turn}?", "messages": []}, config)
+
+        if turn % interval == 0 or turn == turns:
+            elapsed = time.perf_counter() - start
+            print(f"{turn:>8} {rss_mb():>10.1f} {turn / elapsed:>9.0f}")
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    if args.checkpointer == "memory":
+        await run(InMemorySaver(), args.turns, args.users, args.samples)
+        return
+
+    await checkpoint_saver.connect()
+    try:
+        await run(checkpoint_saver, args.turns, args.users, args.samples)
+    finally:
+        for user in range(args.users):
+            await checkpoint_saver.adelete_thread(f"checkpointer-benchmark-{user}")
+        await checkpoint_saver.disconnect()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--checkpointer", choices=["memory", "redis"], default="redis")
+    parser.add_argument("--turns", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--samples", type=int, default=10)
+    args = parser.parse_args()
+
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Compares the latency and throughput of the embedder backends.
+
+Usage (from backend-ai/):
+    python -m benchmarks.embedder_benchmark --backend ollama:nomic-embed-text --backend onnx:models/nomic-embed-text-v1.5
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+from src.core.embedder import Embedder, build_embedder
+
+QUERY = "What is the maximum operating temperature of the pump?"
+PASSAGE = (
+    "The pump must be operated within the rated temperature range. Exceeding the "
+    "maximum operating temperature voids the warranty and may damage the seals. "
+) * 6
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def bench_queries(embedder: Embedder, n: int) -> List[float]:
+    """
+    Measures sequential single-query latency through the async path used by chat.
+    """
+
+    await embedder.aembed_query(QUERY)  # warm up
+    latencies = []
+    for i in range(n):
+        start = time.perf_counter()
+        await embedder.aembed_query(f"{QUERY} ({i})")
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return latencies
+
+
+def bench_documents(embedder: Embedder, n: int) -> float:
+    """
+    Measures batch throughput through the path used by the embedding worker.
+    """
+
+    texts = [f"{PASSAGE} ({i})" for i in range(n)]
+    embedder.embed_documents(texts[: embedder.batch_size])  # warm up
+
+    start = time.perf_counter()
+    embedder.embed_documents(texts)
+    return n / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--backend",
+        action="append",
+        required=True,
+        help="backend:model pair, e.g. ollama:nomic-embed-text. Can be repeated.",
+    )
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--documents", type=int, default=1024)
+    args = parser.parse_args()
+
+    print(f"{'backend':<50} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8} {'docs/s':>9}")
+    for spec in args.backend:
+        backend, model = spec.split(":", 1)
+        embedder = build_embedder(backend, model)
+
+        latencies = asyncio.run(bench_queries(embedder, args.queries))
+        throughput = bench_documents(embedder, args.documents)
+
+        print(
+            f"{spec:<50} {percentile(latencies, 0.5):>8.2f} {percentile(latencies, 0.95):>8.2f} "
+            f"{statistics.mean(latencies):>8.2f} {throughput:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
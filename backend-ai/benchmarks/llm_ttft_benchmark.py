@@ -0,0 +1,93 @@
+"""
+Measures time-to-first-token against the local stub LLM server, comparing a new
+AsyncOpenAI client per call (the previous behaviour) with the shared pooled client.
+
+Pass a self-signed certificate with --ssl-certfile/--ssl-keyfile (and export
+SSL_CERT_FILE=<certfile>) to include the TLS handshake in the comparison.
+
+Usage (from backend-ai/):
+    python -m benchmarks.llm_ttft_benchmark --requests 100
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+from openai import AsyncOpenAI
+from src.core.llm_client import LLMService
+from .stub_llm_server import start_in_thread
+
+
+async def first_token_ms(client: AsyncOpenAI) -> float:
+    start = time.perf_counter()
+    stream = await client.responses.create(model="stub", input="Hello", stream=True)
+
+    ttft = 0.0
+    async for chunk in stream:
+        if chunk.type == "response.output_text.delta" and not ttft:
+            ttft = (time.perf_counter() - start) * 1000
+
+    return ttft
+
+
+async def per_call_clients(base_url: str, n: int) -> List[float]:
+    samples = []
+    for _ in range(n):
+        client = AsyncOpenAI(api_key="stub", base_url=base_url)
+        try:
+            samples.append(await first_token_ms(client))
+        finally:
+            await client.close()
+
+    return samples
+
+
+async def shared_client(base_url: str, n: int) -> List[float]:
+    service = LLMService(api_key="stub", base_url=base_url)
+    await service.connect()
+    await service.warm_up()
+
+    samples = []
+    try:
+        for _ in range(n):
+            async with service.get_client() as client:
+                samples.append(await first_token_ms(client))
+    finally:
+        await service.disconnect()
+
+    return samples
+
+
+def report(name: str, samples: List[float]) -> None:
+    ordered = sorted(samples)
+    print(
+        f"{name:<22} p50 {ordered[len(ordered) // 2]:7.2f} ms   "
+        f"p95 {ordered[int(len(ordered) * 0.95)]:7.2f} ms   mean {statistics.mean(samples):7.2f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--ssl-certfile")
+    parser.add_argument("--ssl-keyfile")
+    args = parser.parse_args()
+
+    start_in_thread(
+        args.port,
+        tokens=20,
+        token_delay_ms=0,
+        ssl_certfile=args.ssl_certfile,
+        ssl_keyfile=args.ssl_keyfile,
+    )
+    scheme = "https" if args.ssl_certfile else "http"
+    base_url = f"{scheme}://127.0.0.1:{args.port}/v1"
+
+    report("client per call", asyncio.run(per_call_clients(base_url, args.requests)))
+    report("shared pooled client", asyncio.run(shared_client(base_url, args.requests)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Measures the latency of the MMR rerank over typical candidate counts and embedding
+sizes, and how many near-duplicates it keeps out of the top-k compared to plain ranking.
+
+Candidates are synthetic: groups of near-identical vectors (chunks of one page)
+around random topics, with relevance decreasing by rank.
+
+Usage (from backend-ai/):
+    python -m benchmarks.mmr_benchmark --dims 768 --k 8
+"""
+
+import argparse
+import statistics
+import time
+from typing import List, Tuple
+import numpy as np
+from src.core.config import env_config
+from src.core.ranking import maximal_marginal_relevance
+
+
+def candidates(
+    fetch_k: int, dims: int, group_size: int, rng: np.random.Generator
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns relevance scores, vectors and the group of every candidate.
+    """
+
+    groups = np.arange(fetch_k) // group_size
+    topics = rng.normal(size=(groups.max() + 1, dims))
+    vectors = topics[groups] + 0.05 * rng.normal(size=(fetch_k, dims))
+    relevance = np.sort(rng.uniform(0.5, 1.0, size=fetch_k))[::-1]
+
+    return relevance.astype(np.float32), vectors.astype(np.float32), groups
+
+
+def distinct_groups(selected: List[int], groups: np.ndarray) -> int:
+    return len({int(groups[i]) for i in selected})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dims", type=int, default=768)
+    parser.add_argument("--k", type=int, default=env_config.RETRIEVAL_TOP_K)
+    parser.add_argument("--fetch-k", type=int, action="append", help="Repeat for several sizes.")
+    parser.add_argument("--group-size", type=int, default=3)
+    parser.add_argument("--lambda-mult", type=float, default=env_config.RETRIEVAL_MMR_LAMBDA)
+    parser.add_argument("--runs", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for fetch_k in args.fetch_k or [10, 20, 40, 100]:
+        relevance, vectors, groups = candidates(fetch_k, args.dims, args.group_size, rng)
+
+        latencies = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            selected = maximal_marginal_relevance(
+                relevance, vectors, k=args.k, lambda_mult=args.lambda_mult
+            )
+            latencies.append((time.perf_counter() - start) * 1e6)
+
+        latencies.sort()
+        print(
+            f"fetch_k={fetch_k:<4} k={args.k}  p50={statistics.median(latencies):7.1f} us  "
+            f"p99={latencies[int(0.99 * len(latencies))]:7.1f} us  "
+            f"distinct pages: top-k={distinct_groups(list(range(args.k)), groups)} "
+            f"mmr={distinct_groups(selected, groups)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Measures the CPU use of idle ingestion status watchers, comparing one Redis pub/sub
+connection per watcher polled with get_message() (the previous behaviour) with the
+process-wide status stream reader. After the idle period, one status update is
+published to every channel and the delivery time is reported.
+
+Needs the Redis server of the API.
+
+Usage (from backend-ai/):
+    python -m benchmarks.pubsub_benchmark --mode hub --watchers 2000 --seconds 10
+"""
+
+import argparse
+import asyncio
+import time
+from typing import AsyncGenerator
+import redis.asyncio as aioredis
+from src.models.ingestion import ProgressState
+from src.services.pubsub_service import pubsub_service
+
+
+async def polling_subscribe(client: aioredis.Redis, channel: str) -> AsyncGenerator[str, None]:
+    pubsub = client.pubsub()
+    await pubsub.subscribe(channel)
+    try:
+        while True:
+            message = await pubsub.get_message(ignore_subscribe_messages=True)
+            if message:
+                yield message["data"]
+            await asyncio.sleep(0.01)
+    finally:
+        await pubsub.aclose()
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    await pubsub_service.connect_async()
+    client = aioredis.Redis(db=1, decode_responses=True, max_connections=args.watchers + 10)
+
+    received = 0
+    done = asyncio.Event()
+
+    async def watch(index: int) -> None:
+        nonlocal received
+        channel = f"status:pubsub-benchmark-{index}"
+        if args.mode == "hub":
+            listener = pubsub_service.subscribe(channel)
+        else:
+            listener = polling_subscribe(client, channel)
+
+        try:
+            async for _ in listener:
+                received += 1
+                if received == args.watchers:
+                    done.set()
+                return
+        finally:
+            await listener.aclose()
+
+    watchers = [asyncio.create_task(watch(i)) for i in range(args.watchers)]
+    await asyncio.sleep(1)
+
+    cpu_start, start = time.process_time(), time.perf_counter()
+    await asyncio.sleep(args.seconds)
+    cpu = time.process_time() - cpu_start
+    elapsed = time.perf_counter() - start
+
+    update = ProgressState(user_id="benchmark", status="SUCCESS", progress=100, details=None)
+    publish_start = time.perf_counter()
+    for i in range(args.watchers):
+        channel = f"status:pubsub-benchmark-{i}"
+        if args.mode == "hub":
+            await pubsub_service.publish_async(channel, update)
+        else:
+            await client.publish(channel, update.model_dump_json())
+    await asyncio.wait_for(done.wait(), timeout=60)
+    delivery = time.perf_counter() - publish_start
+
+    print(
+        f"{args.mode:<15} watchers={args.watchers:<6} idle CPU {100 * cpu / elapsed:6.1f}%   "
+        f"delivered {received} updates in {delivery * 1000:7.1f} ms"
+    )
+
+    await asyncio.gather(*watchers, return_exceptions=True)
+    if args.mode == "hub":
+        await client.delete(*[f"status:pubsub-benchmark-{i}" for i in range(args.watchers)])
+    await client.aclose()
+    await pubsub_service.disconnect_async()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--mode", choices=["hub", "per-connection"], default="hub")
+    parser.add_argument("--watchers", type=int, default=2000)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
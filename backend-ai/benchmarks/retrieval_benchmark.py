@@ -0,0 +1,194 @@
+"""
+Compares recall@k and latency of dense-only and hybrid (BM25 + vector, RRF) retrieval.
+rank-bm25 over the same tokens is reported as an exact BM25 reference for the hashed
+sparse vectors.
+
+The default corpus is synthetic: chunks of similar maintenance text that differ in
+part numbers and error codes, queried by those identifiers. Pass --corpus (JSONL with
+"text") and --queries (JSONL with "query" and "relevant", a list of corpus line
+numbers) to run it on real data. Uses the configured embedder and a local Qdrant
+store, or a Qdrant server with --qdrant-host.
+
+Usage (from backend-ai/):
+    python -m benchmarks.retrieval_benchmark --chunks 2000 --k 4
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from typing import Dict, List, Tuple
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.models import PointStruct
+from rank_bm25 import BM25Okapi
+from src.core.config import env_config
+from src.core.embedder import get_embedder
+from src.core.sparse import tokenize
+from src.db.qdrant import build_payload, build_vector, qdrant_service
+from src.services.retrieval_service import retrieval_service
+
+USER_ID = "benchmark"
+COLLECTION = "benchmark_hybrid"
+
+SENTENCES = [
+    "Inspect the seals and bearings before restarting the unit.",
+    "If the controller reports a fault, power cycle it and check the wiring harness.",
+    "Replace the filter cartridge every six months or after heavy use.",
+    "The pump must not run dry, as this damages the impeller.",
+    "Record the readings in the maintenance log after every inspection.",
+    "Use only lubricants approved by the manufacturer.",
+]
+
+
+def synthetic_corpus(n: int, seed: int) -> Tuple[List[str], List[Tuple[str, List[int]]]]:
+    """
+    Builds n chunks that each mention a unique part number and error code,
+    and one query per chunk asking for one of them.
+    """
+
+    rng = random.Random(seed)
+    texts, queries = [], []
+    for i in range(n):
+        part = f"PN-{rng.randint(10000, 99999)}-{rng.choice('ABCDEF')}"
+        code = f"E{rng.randint(1000, 9999)}"
+        body = " ".join(rng.sample(SENTENCES, 3))
+        texts.append(f"Error {code} on assembly {part}. {body}")
+        queries.append(
+            (f"What should I do about error {code}?", [i])
+            if i % 2
+            else (f"How do I service part {part}?", [i])
+        )
+
+    return texts, queries
+
+
+def load_jsonl(path: str) -> List[Dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def index_corpus(texts: List[str]) -> None:
+    embedder = get_embedder()
+    qdrant_service.create_collection(COLLECTION, dims=embedder.dims)
+    assert qdrant_service.client is not None
+
+    for i in range(0, len(texts), embedder.batch_size):
+        batch = texts[i : i + embedder.batch_size]
+        vectors = embedder.embed_documents(batch)
+        qdrant_service.client.upsert(
+            collection_name=COLLECTION,
+            points=[
+                PointStruct(
+                    id=i + j,
+                    vector=build_vector(vector, text, sparse=True),
+                    payload=build_payload(text, {"user_id": USER_ID}),
+                )
+                for j, (vector, text) in enumerate(zip(vectors, batch))
+            ],
+        )
+
+
+async def evaluate(
+    name: str, queries: List[Tuple[str, List[int]]], k: int, hybrid: bool
+) -> None:
+    env_config.RETRIEVAL_HYBRID = hybrid
+    embedder = get_embedder()
+
+    hits, latencies = 0, []
+    for query, relevant in queries:
+        query_embedding = await embedder.aembed_query(query)
+
+        start = time.perf_counter()
+        chunks = await retrieval_service.search(
+            user_id=USER_ID, query_embedding=query_embedding, user_query=query, k=k
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        found = {int(chunk.id) for chunk in chunks}
+        hits += len(found & set(relevant)) / len(relevant)
+
+    print(
+        f"{name:<12} recall@{k}={hits / len(queries):.3f}  "
+        f"p50={statistics.median(latencies):.1f} ms  p95={percentile(latencies, 0.95):.1f} ms"
+    )
+
+
+def evaluate_bm25(texts: List[str], queries: List[Tuple[str, List[int]]], k: int) -> None:
+    bm25 = BM25Okapi([tokenize(text) for text in texts])
+
+    hits, latencies = 0, []
+    for query, relevant in queries:
+        start = time.perf_counter()
+        top = bm25.get_top_n(tokenize(query), list(range(len(texts))), n=k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(set(top) & set(relevant)) / len(relevant)
+
+    print(
+        f"{'rank-bm25':<12} recall@{k}={hits / len(queries):.3f}  "
+        f"p50={statistics.median(latencies):.1f} ms  (in-process reference)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--queries", help="JSONL file with 'query' and 'relevant'.")
+    parser.add_argument("--corpus", help="JSONL file with 'text'.")
+    parser.add_argument("--sample", type=int, default=200, help="Number of queries to run.")
+    parser.add_argument("--k", type=int, default=env_config.RETRIEVAL_TOP_K)
+    parser.add_argument("--qdrant-host")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    if args.corpus and args.queries:
+        texts = [record["text"] for record in load_jsonl(args.corpus)]
+        queries = [(record["query"], record["relevant"]) for record in load_jsonl(args.queries)]
+    else:
+        texts, queries = synthetic_corpus(args.chunks, args.seed)
+    queries = random.Random(args.seed).sample(queries, min(args.sample, len(queries)))
+
+    env_config.RAG_COLLECTION_NAME = COLLECTION
+    path = None
+    if args.qdrant_host:
+        qdrant_service.client = QdrantClient(host=args.qdrant_host)
+        if qdrant_service.client.collection_exists(COLLECTION):
+            qdrant_service.client.delete_collection(COLLECTION)
+    else:
+        path = tempfile.mkdtemp()
+        qdrant_service.client = QdrantClient(path=path)
+
+    print(f"Indexing {len(texts)} chunks...")
+    index_corpus(texts)
+
+    async def run() -> None:
+        if args.qdrant_host:
+            await retrieval_service.connect()
+        else:
+            # The local store can't be opened by two clients at once.
+            qdrant_service.disconnect()
+            retrieval_service.client = AsyncQdrantClient(path=path)
+
+        await evaluate("dense", queries, args.k, hybrid=False)
+        await evaluate("hybrid", queries, args.k, hybrid=True)
+        evaluate_bm25(texts, queries, args.k)
+
+        if args.qdrant_host and retrieval_service.client is not None:
+            await retrieval_service.client.delete_collection(COLLECTION)
+        await retrieval_service.disconnect()
+
+    asyncio.run(run())
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Compares the local query router with the LLM classification it replaces. The LLM
+labels are taken as ground truth, so this needs the configured Groq model and embedder.
+
+Queries are read one per line from --queries, or taken from a built-in set that
+doesn't overlap with the router's examples.
+
+Usage (from backend-ai/):
+    python -m benchmarks.router_benchmark --queries queries.txt
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+from src.core.config import env_config
+from src.core.llm_client import llm_service
+from src.core.utils import get_query_embeddings
+from src.services.llm_service import classify_query_with_llm
+from src.services.router_service import query_router
+
+QUERIES = [
+    "Good evening!",
+    "How are you doing today?",
+    "Write a haiku about autumn.",
+    "What's 15% of 80?",
+    "Explain recursion like I'm five.",
+    "Suggest a name for my cat.",
+    "What's the best way to learn Rust?",
+    "Open https://news.ycombinator.com and summarize the top story.",
+    "Who painted the Mona Lisa?",
+    "Can you recommend a sci-fi novel?",
+    "What's the boiling point of water at high altitude?",
+    "Draft an email asking my manager for a day off.",
+    "What is the notice period stated in my employment contract?",
+    "Summarize section 2 of the whitepaper.",
+    "What are the system requirements listed in the installation guide?",
+    "Which figures are reported for Q3 revenue in the financial statement?",
+    "What does the policy document say about travel reimbursement?",
+    "Extract the contact details from the uploaded brochure.",
+    "What conclusions does the thesis reach?",
+    "How many vacation days does the employee handbook allow?",
+    "List the ingredients mentioned in the recipe PDF.",
+    "What's the interest rate in the loan agreement I sent?",
+    "What does the document say on page 12?",
+    "Explain the architecture diagram described in the design doc.",
+]
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run(queries: List[str]) -> None:
+    await llm_service.connect()
+    await query_router.warm_up()
+
+    llm_latencies, router_latencies, margins = [], [], []
+    agreed = fallbacks = fallback_agreed = 0
+
+    for query in queries:
+        start = time.perf_counter()
+        expected = await classify_query_with_llm(query)
+        llm_latencies.append((time.perf_counter() - start) * 1000)
+
+        # The query embedding is computed for retrieval anyway, but is included
+        # here, so the comparison holds for 'NORMAL' queries too.
+        start = time.perf_counter()
+        predicted, margin = await query_router.route(await get_query_embeddings(query))
+        router_latencies.append((time.perf_counter() - start) * 1000)
+        margins.append(margin)
+
+        agreed += predicted == expected
+        if margin < env_config.ROUTER_CONFIDENCE_THRESHOLD:
+            fallbacks += 1
+        else:
+            fallback_agreed += predicted == expected
+
+        marker = " " if predicted == expected else "x"
+        print(f"{marker} llm={expected:<9} router={predicted:<9} margin={margin:.3f}  {query}")
+
+    await llm_service.disconnect()
+
+    n = len(queries)
+    confident = n - fallbacks
+    saved = statistics.median(llm_latencies) - statistics.median(router_latencies)
+    print()
+    print(f"local accuracy:   {agreed / n:.1%} ({agreed}/{n})")
+    print(
+        f"hybrid accuracy:  {(fallback_agreed + fallbacks) / n:.1%} "
+        f"({fallbacks} LLM fallbacks at threshold {env_config.ROUTER_CONFIDENCE_THRESHOLD})"
+    )
+    if confident:
+        print(f"confident-only:   {fallback_agreed / confident:.1%} ({fallback_agreed}/{confident})")
+    print(
+        f"llm latency:      p50={statistics.median(llm_latencies):.1f} ms  "
+        f"p95={percentile(llm_latencies, 0.95):.1f} ms"
+    )
+    print(
+        f"router latency:   p50={statistics.median(router_latencies):.1f} ms  "
+        f"p95={percentile(router_latencies, 0.95):.1f} ms"
+    )
+    print(f"p50 saved / turn: {saved:.1f} ms (local), {saved * confident / n:.1f} ms (hybrid)")
+    print(f"margin p50:       {statistics.median(margins):.3f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", help="File with one query per line.")
+    args = parser.parse_args()
+
+    queries = QUERIES
+    if args.queries:
+        with open(args.queries) as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    asyncio.run(run(queries))
+
+
+if __name__ == "__main__":
+    main()
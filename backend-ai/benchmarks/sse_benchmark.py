@@ -0,0 +1,93 @@
+"""
+Measures tokens per second and CPU time per stream of the chat SSE output against the
+local stub LLM server, comparing one pydantic-serialized event per delta with a 10 ms
+sleep (the previous behaviour) with the coalescing writer.
+
+CPU time is the event loop thread's, so it excludes the stub server but includes
+parsing the model stream, which is the same in both modes.
+
+Usage (from backend-ai/):
+    python -m benchmarks.sse_benchmark --streams 20 --tokens 500
+"""
+
+import argparse
+import asyncio
+import time
+from typing import AsyncGenerator, Tuple
+from openai import AsyncOpenAI
+from src.core.config import env_config
+from src.core.sse import coalesce_events
+from src.models.chat import ChatEvent
+from .stub_llm_server import start_in_thread
+
+
+async def deltas(client: AsyncOpenAI, sleep: bool) -> AsyncGenerator[ChatEvent, None]:
+    stream = await client.responses.create(model="stub", input="Hello", stream=True)
+    async for chunk in stream:
+        if chunk.type == "response.output_text.delta":
+            yield ChatEvent(type="text", content=chunk.delta)
+            if sleep:
+                await asyncio.sleep(0.01)
+
+
+async def per_delta_stream(client: AsyncOpenAI) -> Tuple[int, int]:
+    frames, size = 0, 0
+    async for event in deltas(client, sleep=True):
+        frame = f"data: {event.model_dump_json()}\n\n"
+        frames += 1
+        size += len(frame)
+
+    return frames, size
+
+
+async def coalesced_stream(client: AsyncOpenAI, interval: float, flush_bytes: int) -> Tuple[int, int]:
+    frames, size = 0, 0
+    async for frame in coalesce_events(
+        deltas(client, sleep=False), flush_interval=interval, flush_bytes=flush_bytes
+    ):
+        frames += 1
+        size += len(frame)
+
+    return frames, size
+
+
+async def run(name: str, base_url: str, args: argparse.Namespace) -> None:
+    client = AsyncOpenAI(api_key="stub", base_url=base_url)
+
+    async def stream() -> Tuple[int, int]:
+        if name == "per-delta + sleep":
+            return await per_delta_stream(client)
+        return await coalesced_stream(client, args.flush_interval, args.flush_bytes)
+
+    start, cpu_start = time.perf_counter(), time.thread_time()
+    results = await asyncio.gather(*(stream() for _ in range(args.streams)))
+    elapsed, cpu = time.perf_counter() - start, time.thread_time() - cpu_start
+    await client.close()
+
+    frames = sum(result[0] for result in results)
+    print(
+        f"{name:<18} {args.streams * args.tokens / elapsed:9.0f} tokens/s   "
+        f"{cpu / args.streams * 1000:7.1f} ms CPU/stream   "
+        f"{frames / args.streams:6.0f} events/stream   {elapsed:6.2f} s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--streams", type=int, default=20)
+    parser.add_argument("--tokens", type=int, default=500)
+    parser.add_argument("--token-delay-ms", type=float, default=0.0)
+    parser.add_argument("--flush-interval", type=float, default=env_config.SSE_FLUSH_INTERVAL)
+    parser.add_argument("--flush-bytes", type=int, default=env_config.SSE_FLUSH_BYTES)
+    args = parser.parse_args()
+
+    start_in_thread(args.port, tokens=args.tokens, token_delay_ms=args.token_delay_ms)
+    base_url = f"http://127.0.0.1:{args.port}/v1"
+
+    for name in ("per-delta + sleep", "coalesced"):
+        asyncio.run(run(name, base_url, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Local OpenAI-compatible stub server for benchmarks. It implements streaming
+`POST /v1/responses` and `GET /v1/models`.
+
+Usage (from backend-ai/):
+    python -m benchmarks.stub_llm_server --port 8100 --tokens 200 --token-delay-ms 5
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+from typing import AsyncGenerator
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+
+def create_app(tokens: int, token_delay_ms: float) -> FastAPI:
+    app = FastAPI()
+
+    def frame(event: dict) -> str:
+        return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    async def stream_response() -> AsyncGenerator[str, None]:
+        response = {"id": "resp_stub", "object": "response", "status": "in_progress", "output": []}
+        yield frame({"type": "response.created", "sequence_number": 0, "response": response})
+
+        for i in range(tokens):
+            if token_delay_ms > 0:
+                await asyncio.sleep(token_delay_ms / 1000)
+            yield frame(
+                {
+                    "type": "response.output_text.delta",
+                    "sequence_number": i + 1,
+                    "item_id": "msg_stub",
+                    "output_index": 0,
+                    "content_index": 0,
+                    "delta": f"tok{i} ",
+                    "logprobs": [],
+                }
+            )
+
+        yield frame(
+            {
+                "type": "response.completed",
+                "sequence_number": tokens + 1,
+                "response": {**response, "status": "completed"},
+            }
+        )
+
+    @app.post("/v1/responses")
+    async def responses() -> StreamingResponse:
+        return StreamingResponse(stream_response(), media_type="text/event-stream")
+
+    @app.get("/v1/models")
+    async def models() -> dict:
+        return {"object": "list", "data": [{"id": "stub", "object": "model", "owned_by": "stub"}]}
+
+    return app
+
+
+def start_in_thread(
+    port: int,
+    tokens: int,
+    token_delay_ms: float,
+    ssl_certfile: str | None = None,
+    ssl_keyfile: str | None = None,
+) -> uvicorn.Server:
+    """
+    Starts the stub server on a background thread and waits until it accepts requests.
+    """
+
+    config = uvicorn.Config(
+        create_app(tokens, token_delay_ms),
+        host="127.0.0.1",
+        port=port,
+        log_level="warning",
+        ssl_certfile=ssl_certfile,
+        ssl_keyfile=ssl_keyfile,
+    )
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+
+    while not server.started:
+        time.sleep(0.05)
+
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--token-delay-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(args.tokens, args.token_delay_ms), host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,13 +5,23 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from src.api.router import api_router
-from src.core.db import setup_db_index
+from src.core.db import setup_db_index, setup_vector_index
 from src.models.api import ApiError, ApiResponse
 from src.db.s3 import s3_client
+from src.db.chunk_store import chunk_store
+from src.db.qdrant import qdrant_service
+from src.core.llm_client import llm_service
 from src.services.pubsub_service import pubsub_service
 from src.services.queue_service import queue_service
 from src.services.batch_tracking_service import batch_tracking_service
 from src.services.streaming_service import stream_service
+from src.services.chat_stream_service import chat_stream_service
+from src.services.retrieval_service import retrieval_service
+from src.services.router_service import query_router
+from src.services.answer_cache_service import answer_cache_service
+from src.db.mem0 import mem0_client
+from src.db.checkpointer import checkpoint_saver
+from src.core.config import env_config
 
 
 @asynccontextmanager
@@ -19,13 +29,29 @@ async def lifespan(_: FastAPI):
     # Startup
     print("LIFESPAN: Connecting clients...")
     await setup_db_index()
+    await setup_vector_index()
     pubsub_service.connect()
     await pubsub_service.connect_async()
     queue_service.connect()
     batch_tracking_service.connect()
     await batch_tracking_service.connect_async()
     await stream_service.connect()
+    await chat_stream_service.connect()
     s3_client.connect()
+    if env_config.RAG_PAYLOAD_MODE == "external":
+        chunk_store.connect(create=True)
+    qdrant_service.connect()
+    await llm_service.connect()
+    await llm_service.warm_up()
+    await retrieval_service.connect()
+    await answer_cache_service.connect()
+    await checkpoint_saver.connect()
+    try:
+        await mem0_client.connect()
+    except Exception as e:
+        print(f"LIFESPAN: mem0 client failed to connect, it will be retried on first use: {str(e)}")
+    if env_config.ROUTER_MODE != "llm":
+        await query_router.warm_up()
 
     yield
     # Shutdown
@@ -36,7 +62,15 @@ async def lifespan(_: FastAPI):
     batch_tracking_service.disconnect()
     await batch_tracking_service.disconnect_async()
     await stream_service.disconnect()
+    await chat_stream_service.disconnect()
     s3_client.disconnect()
+    chunk_store.disconnect()
+    qdrant_service.disconnect()
+    await llm_service.disconnect()
+    await retrieval_service.disconnect()
+    await answer_cache_service.disconnect()
+    await checkpoint_saver.disconnect()
+    await mem0_client.disconnect()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -1,38 +1,78 @@
 import asyncio
-from typing import AsyncGenerator
-from fastapi import APIRouter, BackgroundTasks, Depends, Request, UploadFile
+import re
+from typing import AsyncGenerator, List
+from fastapi import APIRouter, Depends, Header, Request, UploadFile
 from fastapi.responses import StreamingResponse
-from ...models.api import ChatForm, ChatRequestBody
+from ...models.api import ApiError, ChatForm, ChatRequestBody
 from ...models.chat import ChatEvent
+from ...core.config import env_config
 from ...core.dependencies import get_current_user
+from ...core.sse import coalesce_events, sse_event
 from ...services.tts_service import tts_service
 from ...services.voice_agent import speech_to_text
 from ...services.llm_service import stream_llm_response
 from ...services.streaming_service import stream_service
-from ...db.mem0 import mem0_client
+from ...services.chat_stream_service import chat_stream_service
+from ...services.queue_service import queue_service
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
 
 @router.post("/text")
 async def chat_handler(
-    background_tasks: BackgroundTasks,
     req: Request,
     user_id: str = Depends(get_current_user),
 ) -> StreamingResponse:
     """
     This handler tackles text-based chat requests. It authenticates the user and streams
     back a series of Server-Sent Events (SSE) containing the LLM's response.
+
+    The response is generated in the background and buffered in Redis. The first event
+    carries the stream ID, and every later event an SSE ID, so a dropped client can
+    resume the response on '/text/{stream_id}'.
     """
 
     body = await req.json()
     validated_body = ChatRequestBody.model_validate(body)
 
-    return StreamingResponse(
-        text_workflow(
+    stream_id, live_frames = chat_stream_service.start(
+        user_id=user_id,
+        frames=text_workflow(
             user_query=validated_body.query,
             user_id=user_id,
-            background_tasks=background_tasks,
+            batch_ids=validated_body.batch_ids,
+            document_ids=validated_body.document_ids,
+        ),
+    )
+
+    async def response() -> AsyncGenerator[bytes, None]:
+        yield sse_event("stream", stream_id)
+        async for frame in live_frames:
+            yield frame
+
+    return StreamingResponse(response(), media_type="text/event-stream")
+
+
+@router.get("/text/{stream_id}")
+async def resume_chat_handler(
+    stream_id: str,
+    last_event_id: str | None = Header(default=None),
+    user_id: str = Depends(get_current_user),
+) -> StreamingResponse:
+    """
+    This handler resumes a text chat response after a dropped connection. It replays
+    the events after the one in the 'Last-Event-ID' header, or all events without it,
+    and streams the rest of the response as it is generated.
+    """
+
+    if last_event_id is not None and not re.fullmatch(r"\d+-\d+", last_event_id):
+        raise ApiError(status_code=400, payload="Invalid Last-Event-ID.", details=None)
+    if not await chat_stream_service.exists(user_id=user_id, stream_id=stream_id):
+        raise ApiError(status_code=404, payload="Chat stream not found or expired.", details=None)
+
+    return StreamingResponse(
+        chat_stream_service.resume(
+            user_id=user_id, stream_id=stream_id, last_event_id=last_event_id
         ),
         media_type="text/event-stream",
     )
@@ -40,7 +80,6 @@ async def chat_handler(
 
 @router.post("/voice")
 async def voice_handler(
-    background_tasks: BackgroundTasks,
     form: ChatForm = Depends(),
     user_id: str = Depends(get_current_user),
 ) -> StreamingResponse:
@@ -52,7 +91,10 @@ async def voice_handler(
 
     return StreamingResponse(
         audio_workflow(
-            data=form.audio, user_id=user_id, background_tasks=background_tasks
+            data=form.audio,
+            user_id=user_id,
+            batch_ids=form.batch_ids,
+            document_ids=form.document_ids,
         ),
         media_type="text/event-stream",
     )
@@ -70,33 +112,46 @@ async def audio_stream_handler(stream_id: str):
 
 
 async def text_workflow(
-    user_query: str, user_id: str, background_tasks: BackgroundTasks
-) -> AsyncGenerator[str, None]:
+    user_query: str,
+    user_id: str,
+    batch_ids: List[str],
+    document_ids: List[str],
+) -> AsyncGenerator[bytes, None]:
     """
     This functions initiates the text query workflow by
     simply streaming the LLM text response to client.
     """
 
     try:
-        yield f"data: {ChatEvent(type='status', content='Thinking....').model_dump_json()}\n\n"
+        yield sse_event("status", "Thinking....")
         full_response = ""
 
-        # Stream LLM response to client.
-        async for delta in stream_llm_response(
-            user_id=user_id, user_query=user_query, is_voice=False
+        async def events() -> AsyncGenerator[ChatEvent, None]:
+            nonlocal full_response
+            async for event in stream_llm_response(
+                user_id=user_id,
+                user_query=user_query,
+                is_voice=False,
+                batch_ids=batch_ids,
+                document_ids=document_ids,
+            ):
+                if event.type == "text":
+                    full_response += event.content
+                yield event
+
+        # Stream LLM response to client, with the deltas merged into fewer events.
+        async for frame in coalesce_events(
+            events(),
+            flush_interval=env_config.SSE_FLUSH_INTERVAL,
+            flush_bytes=env_config.SSE_FLUSH_BYTES,
         ):
-            if delta:
-                full_response += delta
-                yield f"data: {ChatEvent(type='text', content=delta).model_dump_json()}\n\n"
-
-        # mem0 handles updating factual, episodic, and semantic memory.
-        # This process is CPU-intensive as the embedding model is on my local machine
-        # and hence blocks the server. In production, this won't be needed
-        # as the embedding would essentially be a simple API call.
-        background_tasks.add_task(
-            mem0_client.add_memories,
-            user_id,
-            [
+            yield frame
+
+        # mem0 handles updating factual, episodic, and semantic memory. The extraction
+        # runs on the memory worker, which batches the recent turns of the user.
+        queue_service.enqueue_memory_update(
+            user_id=user_id,
+            messages=[
                 {"role": "user", "content": user_query},
                 {"role": "assistant", "content": full_response},
             ],
@@ -104,14 +159,17 @@ async def text_workflow(
     except Exception as e:
         print(f"Error occurred while streaming for user {user_id}: {str(e)}")
 
-        yield f"data: {ChatEvent(type='error', content=f'An error occurred: {str(e)}').model_dump_json()}\n\n"
+        yield sse_event("error", f"An error occurred: {str(e)}")
     finally:
         print(f"Streaming for user {user_id} has ended.")
 
 
 async def audio_workflow(
-    data: UploadFile, user_id: str, background_tasks: BackgroundTasks
-) -> AsyncGenerator[str, None]:
+    data: UploadFile,
+    user_id: str,
+    batch_ids: List[str],
+    document_ids: List[str],
+) -> AsyncGenerator[bytes, None]:
     """
     This function initiates the audio query workflow.
 
@@ -124,32 +182,45 @@ async def audio_workflow(
 
     try:
         # 1. TRANSCRIBE THE AUDIO QUERY-----------------------------------------------------------------
-        yield f"data: {ChatEvent(type='status', content='Transcribing audio...').model_dump_json()}\n\n"
+        yield sse_event("status", "Transcribing audio...")
 
         # Generate transcription and send it as event too in order to update UI.
         transcribed_text = await speech_to_text(file=data)
-        yield f"data: {ChatEvent(type='transcription', content=transcribed_text).model_dump_json()}\n\n"
+        yield sse_event("transcription", transcribed_text)
 
         user_query = transcribed_text
 
         # 2. GENERATE LLM TEXT RESPONSE, STREAM TO TTS API AND TO CLIENT--------------------------------
-        yield f"data: {ChatEvent(type='status', content='Thinking....').model_dump_json()}\n\n"
+        yield sse_event("status", "Thinking....")
         full_response = ""
 
         async with tts_service.connect() as tts_client:
             # Yield stream_id so that client can connect to the endpoint.
-            yield f"data: {ChatEvent(type='audio', content=tts_client.stream_id).model_dump_json()}\n\n"
-
-            # Stream LLM response to client.
-            async for delta in stream_llm_response(
-                user_id=user_id, user_query=user_query, is_voice=True
+            yield sse_event("audio", tts_client.stream_id)
+
+            async def events() -> AsyncGenerator[ChatEvent, None]:
+                nonlocal full_response
+                async for event in stream_llm_response(
+                    user_id=user_id,
+                    user_query=user_query,
+                    is_voice=True,
+                    batch_ids=batch_ids,
+                    document_ids=document_ids,
+                ):
+                    if event.type == "text":
+                        full_response += event.content
+                        await tts_service.sender(
+                            websocket=tts_client.websocket, payload=event.content
+                        )
+                    yield event
+
+            # Stream LLM response to client, with the deltas merged into fewer events.
+            async for frame in coalesce_events(
+                events(),
+                flush_interval=env_config.SSE_FLUSH_INTERVAL,
+                flush_bytes=env_config.SSE_FLUSH_BYTES,
             ):
-                if delta:
-                    full_response += delta
-                    await tts_service.sender(
-                        websocket=tts_client.websocket, payload=delta
-                    )
-                    yield f"data: {ChatEvent(type='text', content=delta).model_dump_json()}\n\n"
+                yield frame
 
             await tts_service.sender(websocket=tts_client.websocket, payload="")
 
@@ -161,12 +232,11 @@ async def audio_workflow(
                 print("TTS Client Connection closed.")
 
 
-        # mem0 handles updating factual, episodic, and semantic memory.
-        # This process is CPU-intensive and hence blocks the server. Therefore, we use an
-        background_tasks.add_task(
-            mem0_client.add_memories,
-            user_id,
-            [
+        # mem0 handles updating factual, episodic, and semantic memory. The extraction
+        # runs on the memory worker, which batches the recent turns of the user.
+        queue_service.enqueue_memory_update(
+            user_id=user_id,
+            messages=[
                 {"role": "user", "content": user_query},
                 {"role": "assistant", "content": full_response},
             ],
@@ -174,6 +244,6 @@ async def audio_workflow(
     except Exception as e:
         print(f"Error occurred while streaming for user {user_id}: {str(e)}")
 
-        yield f"data: {ChatEvent(type='error', content=f'An error occurred: {str(e)}').model_dump_json()}\n\n"
+        yield sse_event("error", f"An error occurred: {str(e)}")
     finally:
         print(f"Streaming for user {user_id} has ended.")
@@ -1,10 +1,12 @@
 import asyncio
-from fastapi import APIRouter, UploadFile, File, Depends, Request
+import re
+from fastapi import APIRouter, UploadFile, File, Depends, Header
 from fastapi.responses import StreamingResponse
-from typing import List
+from typing import List, Literal
 from pydantic import ValidationError
 from ...models.ingestion import ProgressState
 from ...core.dependencies import get_current_user
+from ...core.utils import get_document_id
 from ...db.s3 import s3_client
 from ...services.batch_tracking_service import batch_tracking_service
 from ...services.queue_service import queue_service
@@ -48,76 +50,143 @@ async def upload_files(
             success=True,
             status_code=202,
             payload=IngestPayload(
-                message="Files uploaded and ingestion jobs enqueued.", batch_id=batch_id
+                message="Files uploaded and ingestion jobs enqueued.",
+                batch_id=batch_id,
+                documents={
+                    str(file.filename): get_document_id(user_id, str(file.filename))
+                    for file in files
+                },
             ),
         )
     except Exception as e:
         raise ApiError(status_code=500, payload=str(e), details=None)
 
 
+@router.delete(
+    "/batch/{batch_id}", response_model=ApiResponse[IngestPayload], status_code=202
+)
+async def delete_batch(batch_id: str, user_id: str = Depends(get_current_user)):
+    """
+    Enqueues the deletion of all vectors of an ingestion batch.
+    The returned batch_id tracks the deletion on the status endpoint.
+    """
+
+    batch = await batch_tracking_service.get_batch_status_async(batch_id=batch_id)
+    if batch is None or batch.user_id != user_id:
+        raise ApiError(status_code=404, payload="Batch not found.", details=None)
+
+    return await enqueue_deletion(user_id=user_id, field="batch_id", value=batch_id)
+
+
+@router.delete(
+    "/documents/{document_id}",
+    response_model=ApiResponse[IngestPayload],
+    status_code=202,
+)
+async def delete_document(document_id: str, user_id: str = Depends(get_current_user)):
+    """
+    Enqueues the deletion of all vectors of a document.
+    The returned batch_id tracks the deletion on the status endpoint.
+    """
+
+    return await enqueue_deletion(user_id=user_id, field="document_id", value=document_id)
+
+
+async def enqueue_deletion(
+    user_id: str, field: Literal["batch_id", "document_id"], value: str
+) -> ApiResponse[IngestPayload]:
+    """
+    Creates a batch to track the deletion and enqueues the deletion job.
+    """
+
+    try:
+        tracking_id = await batch_tracking_service.create_batch(1, user_id=user_id)
+
+        queue_service.enqueue_deletion_job(
+            user_id=user_id, batch_id=tracking_id, field=field, value=value
+        )
+
+        return ApiResponse(
+            success=True,
+            status_code=202,
+            payload=IngestPayload(message="Deletion job enqueued.", batch_id=tracking_id),
+        )
+    except Exception as e:
+        raise ApiError(status_code=500, payload=str(e), details=None)
+
+
 @router.get("/status/{batch_id}", dependencies=[Depends(get_current_user)])
-async def get_ingestion_status(req: Request, batch_id: str) -> StreamingResponse:
+async def get_ingestion_status(
+    batch_id: str, last_event_id: str | None = Header(default=None)
+) -> StreamingResponse:
     """
-    Sends batch status updates to clients as server-sent events.
+    Sends batch status updates to clients as server-sent events. Every update carries its
+    stream entry ID as the event ID, and a client reconnecting with 'Last-Event-ID'
+    receives the updates after it.
     """
 
+    if last_event_id is not None and not re.fullmatch(r"\d+-\d+", last_event_id):
+        raise ApiError(status_code=400, payload="Invalid Last-Event-ID.", details=None)
+
     async def ingestion_event_handler():
         """
-        This function setups up a generator function that subscribes and listens to the redis
-        channel for the batch and streams the updates to the client via SSE.
+        This function setups up a generator function that reads the status stream of the
+        batch and streams the updates to the client via SSE.
 
-        Before subscribing, the function first gets current progress directly from hash and returns
-        the progress as first event. If the status is already "SUCCESS", the function simply returns
-        and the connection is closed. Else, the connection is set up and the messages are parsed
-        using pydantic and yielded.
+        On a first connection, the function first gets current progress directly from hash.
+        If the status is already "SUCCESS", it is returned and the connection is closed. If
+        no update was published yet, it is returned as first event. Else, the updates in the
+        stream are replayed and followed, so no transition is missed between the two reads.
         """
 
-        # First we check for the current status in Redis hash and return the result.
-        # This is useful in case the ingestion is over before this endpoint is requested.
-        current_status = await batch_tracking_service.get_batch_status_async(
-            batch_id=batch_id
-        )
-        if current_status is not None:
-            data = ProgressState(
-                details=None,
-                user_id=current_status.user_id,
-                status=current_status.status
-                if current_status.status != "NONE"
-                else "PENDING",
-                progress=int(
-                    (current_status.chunks_embedded / current_status.total_chunks) * 100
-                )
-                if current_status.total_chunks != 0
-                else 0,
+        channel = f"status:{batch_id}"
+
+        if last_event_id is None:
+            current_status = await batch_tracking_service.get_batch_status_async(
+                batch_id=batch_id
             )
-            # Send the first event.
-            yield f"data: {data.model_dump_json()}\n\n"
+            if current_status is not None:
+                data = ProgressState(
+                    details=None,
+                    user_id=current_status.user_id,
+                    status=current_status.status
+                    if current_status.status != "NONE"
+                    else "PENDING",
+                    progress=int(
+                        (current_status.chunks_embedded / current_status.total_chunks) * 100
+                    )
+                    if current_status.total_chunks != 0
+                    else 0,
+                )
 
-            # If the batch process already finished, return. No more streaming required.
-            if current_status.status == "SUCCESS":
-                return
+                # If the batch process already finished, return. No more streaming required.
+                if current_status.status == "SUCCESS":
+                    yield f"data: {data.model_dump_json()}\n\n"
+                    return
+                if not await pubsub_service.has_stream(channel):
+                    yield f"data: {data.model_dump_json()}\n\n"
 
-        channel = f"status:{batch_id}"
-        listener = pubsub_service.subscribe(channel)
+        listener = pubsub_service.subscribe(channel, last_id=last_event_id or "0-0")
 
+        # The listener waits on the process-wide stream reader without polling. When the
+        # client disconnects, the response is cancelled and the listener removed.
         try:
-            while not await req.is_disconnected():
-                async for message in listener:
-                    try:
-                        data = ProgressState.model_validate_json(message)
-
-                        # Send the progress back to client.
-                        yield f"data: {data.model_dump_json()}\n\n"
-
-                        # Close if failed or finished.
-                        if data.status == "FAILED" or data.status == "SUCCESS":
-                            return
-                    except ValidationError as e:
-                        print(f"Received invalid prgress state: {str(e)}")
-                        continue
-
-                await asyncio.sleep(0.01)
+            async for entry_id, message in listener:
+                try:
+                    data = ProgressState.model_validate_json(message)
+
+                    # Send the progress back to client.
+                    yield f"id: {entry_id}\ndata: {data.model_dump_json()}\n\n"
+
+                    # Close if failed or finished.
+                    if data.status == "FAILED" or data.status == "SUCCESS":
+                        return
+                except ValidationError as e:
+                    print(f"Received invalid prgress state: {str(e)}")
+                    continue
         except asyncio.CancelledError:
             print(f"Client disconnected from batch: {batch_id}")
+        finally:
+            await listener.aclose()
 
     return StreamingResponse(ingestion_event_handler(), media_type="text/event-stream")
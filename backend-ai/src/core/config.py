@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
+from typing import Literal
 
 class Settings(BaseSettings):
     # Groq
@@ -7,6 +8,12 @@ class Settings(BaseSettings):
     GROQ_MODEL: str = "openai/gpt-oss-120b"
     GROQ_MODEL_MEM0: str = "llama-3.3-70b-versatile"
     GROQ_BASE_URL: str = "https://api.groq.com/openai/v1"
+    # LLM connection pool
+    LLM_HTTP2: bool = True
+    LLM_MAX_CONNECTIONS: int = 100
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    LLM_KEEPALIVE_EXPIRY: float = 120.0
+    LLM_TIMEOUT: float = 60.0
     # MongoDB
     MONGO_DB_ROOT_USERNAME: str
     MONGO_DB_ROOT_PASSWORD: str
@@ -20,11 +27,112 @@ class Settings(BaseSettings):
     S3_ACCESS_KEY_ID: str
     S3_SECRET_ACCESS_KEY: str
     MINIO_PUBLIC_URL: str
+    # Qdrant
+    QDRANT_PREFER_GRPC: bool = True
+    QDRANT_GRPC_PORT: int = 6334
     # RAG
     RAG_COLLECTION_NAME: str = "file_embeddings"
+    RETRIEVAL_TOP_K: int = 8
+    # Retrieved chunks are merged and packed into at most this many prompt tokens. Chunks are
+    # about 250 tokens, so the default fits all RETRIEVAL_TOP_K hits and only trims larger K.
+    CONTEXT_TOKEN_BUDGET: int = 3000
+    # Hits scoring below this fraction of the best hit are left out of the context.
+    CONTEXT_MIN_RELATIVE_SCORE: float = 0.35
+    # The same cutoff for RRF scores of the hybrid search. These are 1/(RRF_K + rank) summed
+    # over both searches, so they are much flatter than cosine scores: with RRF_K 60, 0.45
+    # keeps the hits of both searches and the top 7 of either when the best hit is in both.
+    CONTEXT_MIN_RELATIVE_FUSED_SCORE: float = 0.45
+    # Hybrid retrieval fuses BM25 and vector search results with Reciprocal Rank Fusion.
+    RETRIEVAL_HYBRID: bool = True
+    # Candidates fetched per search (fetch_k) before fusion and MMR.
+    RETRIEVAL_CANDIDATES: int = 20
+    RETRIEVAL_RRF_K: int = 60
+    # Latency budget of the BM25 search in seconds. Past it, the vector results are used alone.
+    RETRIEVAL_SPARSE_TIMEOUT: float = 0.15
+    # Maximal Marginal Relevance over the candidates. Lambda 1 ranks by relevance only.
+    RETRIEVAL_MMR: bool = True
+    RETRIEVAL_MMR_LAMBDA: float = 0.7
+    # Semantic cache of document-grounded text answers, per user and document set version.
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_THRESHOLD: float = 0.95
+    ANSWER_CACHE_TTL: int = 86400
+    ANSWER_CACHE_CAPACITY: int = 64
+    # Latency budget in seconds for the stages before generation, and the deadline of each
+    # stage. A stage past its deadline is skipped and the answer uses the context it has.
+    CHAT_DEADLINE: float = 3.0
+    CHAT_CLASSIFICATION_TIMEOUT: float = 1.5
+    CHAT_RETRIEVAL_TIMEOUT: float = 2.0
+    CHAT_MEMORY_TIMEOUT: float = 1.5
+    # Conversation checkpoints kept per user in Redis, and seconds they live after the last turn.
+    CHECKPOINT_RETENTION: int = 10
+    CHECKPOINT_TTL: int = 604800
+    # The last HISTORY_KEEP_TURNS turns reach the model verbatim. Older turns are folded into
+    # a running summary in the background, once HISTORY_COMPACT_TURNS of them have piled up.
+    HISTORY_KEEP_TURNS: int = 6
+    HISTORY_COMPACT_TURNS: int = 4
+    HISTORY_SUMMARY_MAX_TOKENS: int = 1024
+    # Text deltas after the first are merged into one SSE event until they reach
+    # SSE_FLUSH_BYTES or the oldest has waited SSE_FLUSH_INTERVAL seconds.
+    SSE_FLUSH_INTERVAL: float = 0.03
+    SSE_FLUSH_BYTES: int = 512
+    # Text chat responses are buffered in Redis streams for this many seconds, so dropped
+    # clients can resume them. Resumed reads give up after the block time without events.
+    CHAT_STREAM_TTL: int = 300
+    CHAT_STREAM_BLOCK_MS: int = 60000
+    # Start retrieval and memory search concurrently with the query classification.
+    CHAT_SPECULATIVE_RETRIEVAL: bool = True
+    # 'local' routes queries by embedding similarity to labelled examples, 'hybrid' falls
+    # back to the LLM below the confidence threshold and 'llm' always asks the LLM.
+    ROUTER_MODE: Literal["llm", "local", "hybrid"] = "hybrid"
+    ROUTER_CONFIDENCE_THRESHOLD: float = 0.05
     EMBEDDER_MODEL: str = "nomic-embed-text"
+    # 'external' keeps only filter fields in Qdrant and the chunk text in the chunk store.
+    RAG_PAYLOAD_MODE: Literal["inline", "external"] = "inline"
+    # SQLite file of the chunk store. It must be an absolute path on a local volume shared by
+    # the API and all workers, which therefore run on the same host. The API creates it on
+    # startup, and the workers fail if it is missing, rather than writing to a store of their own.
+    CHUNK_STORE_PATH: str = "/var/lib/ragscale/chunks.db"
+    CHUNK_STORE_MMAP_SIZE: int = 1 << 30
+    # Embeddings
+    # EMBEDDER_MODEL is the Ollama model name for 'ollama' and a local model directory for 'onnx'.
+    # The mem0 store always uses this embedder. The RAG collection uses it until a re-embedding
+    # migration succeeds, after which the migration's embedder is read from Redis.
+    EMBEDDER_BACKEND: Literal["ollama", "onnx"] = "ollama"
+    EMBEDDER_DIMS: int = 768
+    EMBEDDER_BATCH_SIZE: int = 64
+    EMBEDDER_ONNX_MAX_LENGTH: int = 512
+    EMBEDDER_ONNX_THREADS: int = 0
+    # Seconds the API caches the embedder of the RAG collection. For this long after a
+    # re-embedding migration flips the alias, queries may still be embedded with the old model.
+    EMBEDDER_ACTIVE_TTL: float = 5.0
+    OLLAMA_BASE_URL: str = "http://localhost:11434"
+    # Re-embedding
+    REEMBED_PAGE_SIZE: int = 256
+    REEMBED_MAX_POINTS_PER_SECOND: int = 200  # 0 disables throttling
     # mem0
     MEM0_COLLECTION_NAME: str = "mem0_store"
+    # 'tiered' searches the memory graph only when the best vector memory scores below the
+    # threshold or the query names an entity of the user's graph. 'always' searches both.
+    MEMORY_GRAPH_POLICY: Literal["tiered", "always"] = "tiered"
+    MEMORY_GRAPH_SCORE_THRESHOLD: float = 0.5
+    # Seconds the entity names of a user's graph are cached for the 'tiered' policy at most.
+    # New memories of the user bump the memory version, which refreshes them right away.
+    MEMORY_ENTITY_CACHE_TTL: int = 300
+    # Memory extraction. Turns of a user within the delay are extracted in one mem0 call.
+    MEMORY_COALESCE_DELAY: int = 30
+    MEMORY_COALESCE_MAX_TURNS: int = 20
+    # In-process cache of mem0 search results. Queries share an entry if the SimHash of
+    # their embeddings is equal, so more bits mean fewer but more precise hits (max 62),
+    # and if the cosine similarity of both embeddings reaches the threshold.
+    MEMORY_CACHE_ENABLED: bool = True
+    MEMORY_CACHE_CAPACITY: int = 1024
+    MEMORY_CACHE_HASH_BITS: int = 16
+    MEMORY_CACHE_THRESHOLD: float = 0.95
+    # Ingestion status streams. Each batch keeps its last STATUS_STREAM_MAXLEN updates for
+    # STATUS_STREAM_TTL seconds, so reconnecting clients can catch up.
+    STATUS_STREAM_MAXLEN: int = 100
+    STATUS_STREAM_TTL: int = 86400
+    STATUS_STREAM_BLOCK_MS: int = 30000
     # ElevenLabs
     ELEVENLABS_API_KEY: str
 
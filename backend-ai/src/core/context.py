@@ -0,0 +1,161 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+from ..models.chat import RetrievedChunk
+
+# Rough number of characters per token for English text.
+CHARS_PER_TOKEN = 4
+# Minimum length of a span shared by two chunks to merge them without start offsets.
+MIN_OVERLAP_CHARS = 32
+
+
+@dataclass
+class Passage:
+    text: str
+    score: float
+    start: int | None
+    metadata: Dict = field(default_factory=dict)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimates the number of tokens of a text.
+    """
+
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def merge_texts(first: str, second: str) -> str | None:
+    """
+    Joins two texts if the end of `first` overlaps with the start of `second`,
+    or one contains the other. Returns None if they don't overlap.
+    """
+
+    if second in first:
+        return first
+    if first in second:
+        return second
+
+    # Find where the start of `second` occurs in `first`, and check the rest of `first` matches.
+    probe = second[:MIN_OVERLAP_CHARS]
+    position = first.find(probe)
+    while position != -1:
+        if second.startswith(first[position:]):
+            return first + second[len(first) - position :]
+        position = first.find(probe, position + 1)
+
+    return None
+
+
+def merge_passages(chunks: List[RetrievedChunk]) -> List[Passage]:
+    """
+    Merges hits from the same page that are adjacent or overlap into single passages.
+    Chunks carry their character offset in 'start_index'. For chunks ingested without
+    it, the overlapping span is found in the text. A passage keeps the best score of its hits.
+    """
+
+    pages: Dict[Tuple, List[Passage]] = {}
+    for chunk in chunks:
+        key = (
+            chunk.metadata.get("document_id") or chunk.metadata.get("source"),
+            chunk.metadata.get("page"),
+        )
+        pages.setdefault(key, []).append(
+            Passage(
+                text=chunk.text,
+                score=chunk.score,
+                start=chunk.metadata.get("start_index"),
+                metadata=chunk.metadata,
+            )
+        )
+
+    passages: List[Passage] = []
+    for hits in pages.values():
+        hits.sort(key=lambda hit: hit.start if hit.start is not None else -1)
+
+        merged: List[Passage] = []
+        for hit in hits:
+            for passage in merged:
+                text = None
+                if passage.start is not None and hit.start is not None:
+                    end = passage.start + len(passage.text)
+                    if hit.start <= end:
+                        text = passage.text + hit.text[end - hit.start :]
+                else:
+                    text = merge_texts(passage.text, hit.text) or merge_texts(
+                        hit.text, passage.text
+                    )
+
+                if text is not None:
+                    passage.text = text
+                    passage.score = max(passage.score, hit.score)
+                    break
+            else:
+                merged.append(hit)
+
+        passages.extend(merged)
+
+    return passages
+
+
+def truncate(text: str, max_tokens: int) -> str:
+    """
+    Cuts a text to about `max_tokens` tokens at the last whitespace.
+    """
+
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+
+    cut = text.rfind(" ", 0, limit)
+    return text[: cut if cut > 0 else limit] + " ..."
+
+
+def assemble_context(
+    chunks: List[RetrievedChunk], token_budget: int, min_relative_score: float
+) -> str:
+    """
+    Builds the document context for the prompt from the retrieved chunks.
+
+    Overlapping hits from the same page are merged, and hits scoring below
+    `min_relative_score` times the best score are dropped, so the number of passages
+    adapts to how many hits are relevant. The cutoff only applies if the best score is
+    positive, since cosine scores can be negative. The passages are then added best first until
+    the token budget is used up. The last passage is truncated to fit if enough budget is left.
+
+    This function accepts the following parameters:
+    - chunks: Retrieved chunks, in any order.
+    - token_budget: Maximum number of tokens of the context.
+    - min_relative_score: Score cutoff relative to the best hit.
+    """
+
+    if not chunks:
+        return ""
+
+    best_score = max(chunk.score for chunk in chunks)
+    if best_score > 0:
+        chunks = [chunk for chunk in chunks if chunk.score >= best_score * min_relative_score]
+
+    passages = merge_passages(chunks)
+    passages.sort(key=lambda passage: passage.score, reverse=True)
+
+    blocks: List[str] = []
+    remaining = token_budget
+    for passage in passages:
+        source = passage.metadata.get("file_name") or "Document"
+        header = f"[{len(blocks) + 1}] {source}, page {passage.metadata.get('page_label', '?')}\n"
+
+        available = remaining - estimate_tokens(header)
+        needed = estimate_tokens(passage.text)
+        if needed > available:
+            # Truncating to a short fragment isn't worth the tokens.
+            if available < min(needed, 64):
+                continue
+            text = truncate(passage.text, available)
+        else:
+            text = passage.text
+
+        block = header + text
+        blocks.append(block)
+        remaining -= estimate_tokens(block) + 1
+
+    return "\n\n".join(blocks)
@@ -1,4 +1,7 @@
+import asyncio
+from .config import env_config
 from ..db.mongo import users_collection
+from ..db.qdrant import qdrant_service
 
 
 async def setup_db_index():
@@ -8,3 +11,27 @@ async def setup_db_index():
 
     await users_collection.create_index("username", unique=True)
     print("Database index on 'username' field created successfully.")
+
+
+async def setup_vector_index():
+    """
+    This function creates the payload indexes used for filtering on the RAG collection.
+    Collections created before an index was added are indexed here too.
+    """
+
+    def create_indexes() -> None:
+        if not qdrant_service.client:
+            qdrant_service.connect()
+        if qdrant_service.client is not None and qdrant_service.client.collection_exists(
+            env_config.RAG_COLLECTION_NAME
+        ):
+            qdrant_service.create_payload_indexes(env_config.RAG_COLLECTION_NAME)
+            print("Payload indexes on the RAG collection created successfully.")
+
+            if not qdrant_service.has_sparse_vectors(env_config.RAG_COLLECTION_NAME):
+                print(
+                    "WARNING: The RAG collection has no BM25 sparse vectors, so retrieval is dense only. "
+                    "Run the re-embedding worker to migrate it."
+                )
+
+    await asyncio.to_thread(create_indexes)
@@ -0,0 +1,195 @@
+import asyncio
+import os
+from abc import abstractmethod
+from functools import lru_cache
+from typing import List
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_ollama import OllamaEmbeddings
+from .config import env_config
+
+
+class Embedder(Embeddings):
+    """
+    Base class for the embedding backends.
+
+    Backends only implement `embed_batch`, which embeds one batch of texts in a single
+    call. The base class splits larger inputs into batches of `batch_size`. Since this is a
+    LangChain `Embeddings` subclass, an embedder can be handed to `QdrantVectorStore` or mem0 as is.
+    """
+
+    def __init__(self, model: str, dims: int, batch_size: int) -> None:
+        self.model = model
+        self.dims = dims
+        self.batch_size = batch_size
+
+    @abstractmethod
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeds a single batch of texts in one call to the backend.
+        """
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeds a list of texts in batches of `batch_size`.
+        """
+
+        vectors: List[List[float]] = []
+        for i in range(0, len(texts), self.batch_size):
+            vectors.extend(self.embed_batch(texts[i : i + self.batch_size]))
+
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embeds a single query text.
+        """
+
+        return self.embed_batch([text])[0]
+
+
+class OllamaEmbedder(Embedder):
+    """
+    Embeds texts over HTTP with an Ollama server. The `/api/embed` endpoint accepts
+    a list of inputs, so every batch is a single request.
+    """
+
+    def __init__(self, model: str, dims: int, batch_size: int, base_url: str) -> None:
+        super().__init__(model=model, dims=dims, batch_size=batch_size)
+        self.client = OllamaEmbeddings(model=model, base_url=base_url)
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        return self.client.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors: List[List[float]] = []
+        for i in range(0, len(texts), self.batch_size):
+            vectors.extend(
+                await self.client.aembed_documents(texts[i : i + self.batch_size])
+            )
+
+        return vectors
+
+    async def aembed_query(self, text: str) -> List[float]:
+        # Uses the native async ollama client instead of the default thread pool.
+        return await self.client.aembed_query(text)
+
+
+class OnnxEmbedder(Embedder):
+    """
+    Runs a sentence embedding model in-process on the CPU with ONNX Runtime.
+
+    `model_path` is a local directory holding `model.onnx` (or `onnx/model.onnx`, the
+    Hugging Face export layout) and `tokenizer.json`. Token embeddings are mean pooled
+    over the attention mask and L2 normalized.
+    """
+
+    def __init__(
+        self, model_path: str, dims: int, batch_size: int, max_length: int, threads: int
+    ) -> None:
+        super().__init__(model=model_path, dims=dims, batch_size=batch_size)
+
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError(
+                "The onnx embedder backend requires onnxruntime and tokenizers. "
+                "Install them with `uv sync --extra onnx`."
+            ) from e
+
+        model_file = os.path.join(model_path, "model.onnx")
+        if not os.path.exists(model_file):
+            model_file = os.path.join(model_path, "onnx", "model.onnx")
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_path, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        if self.tokenizer.padding is None:
+            self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            options.intra_op_num_threads = threads
+
+        self.session = ort.InferenceSession(
+            model_file, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        print(f"ONNX embedder loaded from {model_file}.")
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array(
+            [encoding.attention_mask for encoding in encodings], dtype=np.int64
+        )
+
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+        output = self.session.run(None, feeds)[0]
+
+        # Some exports already return pooled sentence embeddings.
+        if output.ndim == 3:
+            mask = attention_mask[..., None].astype(output.dtype)
+            output = (output * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+        norms = np.linalg.norm(output, axis=1, keepdims=True)
+        return (output / np.clip(norms, 1e-12, None)).tolist()
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(self.embed_documents, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        # ONNX Runtime releases the GIL, so inference runs in parallel to the event loop.
+        return await asyncio.to_thread(self.embed_query, text)
+
+
+def build_embedder(backend: str, model: str, dims: int = env_config.EMBEDDER_DIMS) -> Embedder:
+    """
+    Creates an embedder for the given backend. For the 'ollama' backend, `model` is the
+    Ollama model name. For the 'onnx' backend, it is the local model directory.
+    """
+
+    if backend == "ollama":
+        return OllamaEmbedder(
+            model=model,
+            dims=dims,
+            batch_size=env_config.EMBEDDER_BATCH_SIZE,
+            base_url=env_config.OLLAMA_BASE_URL,
+        )
+    if backend == "onnx":
+        return OnnxEmbedder(
+            model_path=model,
+            dims=dims,
+            batch_size=env_config.EMBEDDER_BATCH_SIZE,
+            max_length=env_config.EMBEDDER_ONNX_MAX_LENGTH,
+            threads=env_config.EMBEDDER_ONNX_THREADS,
+        )
+
+    raise ValueError(f"Unsupported embedder backend: {backend}")
+
+
+@lru_cache(maxsize=4)
+def load_embedder(backend: str, model: str, dims: int) -> Embedder:
+    """
+    Returns the process-wide embedder for the given backend and model.
+    """
+
+    return build_embedder(backend, model, dims)
+
+
+def get_embedder() -> Embedder:
+    """
+    Returns the process-wide embedder selected by `EMBEDDER_BACKEND`.
+
+    The mem0 memory store always uses it. The RAG collection uses it until a
+    re-embedding migration moves the collection to another model, see `EmbedderService`.
+    """
+
+    return load_embedder(
+        env_config.EMBEDDER_BACKEND, env_config.EMBEDDER_MODEL, env_config.EMBEDDER_DIMS
+    )
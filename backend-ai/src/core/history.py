@@ -0,0 +1,81 @@
+import hashlib
+from typing import Any, Dict, List, Tuple
+import orjson
+
+TRIM_MARKER = "trim_history"
+
+
+def fingerprint(messages: List[Dict[str, Any]]) -> str:
+    return hashlib.sha1(orjson.dumps(messages)).hexdigest()
+
+
+def trim_marker(messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Returns a marker that makes the messages reducer drop the given oldest messages.
+    """
+
+    return {"type": TRIM_MARKER, "count": len(messages), "fingerprint": fingerprint(messages)}
+
+
+def merge_messages(
+    existing: List[Dict[str, Any]], update: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    Reducer of the conversation messages. New messages are appended, and a trim marker
+    drops the oldest messages once they are summarised.
+
+    A marker only applies while the oldest messages are still the ones it was made for,
+    so a compaction that is applied twice or raced by another one trims nothing.
+    """
+
+    messages = list(existing or [])
+    for message in update:
+        if message.get("type") == TRIM_MARKER:
+            count = message["count"]
+            if fingerprint(messages[:count]) == message["fingerprint"]:
+                messages = messages[count:]
+        else:
+            messages.append(message)
+
+    return messages
+
+
+def split_history(
+    messages: List[Dict[str, Any]], keep_turns: int
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Splits the messages before the last keep_turns turns from the last turns.
+    A turn starts with a user message.
+    """
+
+    turn_starts = [i for i, message in enumerate(messages) if message.get("role") == "user"]
+    if len(turn_starts) <= keep_turns:
+        return [], messages
+
+    cut = turn_starts[-keep_turns] if keep_turns > 0 else len(messages)
+    return messages[:cut], messages[cut:]
+
+
+def context_digest(messages: List[Dict[str, Any]]) -> str:
+    """
+    Returns a digest of the last turn of the messages, which a follow-up query may
+    refer to, or an empty string if there is none.
+    """
+
+    _, last_turn = split_history(messages, keep_turns=1)
+    return fingerprint(last_turn) if last_turn else ""
+
+
+def count_turns(messages: List[Dict[str, Any]]) -> int:
+    return sum(1 for message in messages if message.get("role") == "user")
+
+
+def format_transcript(messages: List[Dict[str, Any]]) -> str:
+    """
+    Formats messages as a plain 'User: ... / Assistant: ...' transcript.
+    """
+
+    return "\n".join(
+        f"{str(message.get('role', '')).capitalize()}: {message.get('content', '')}"
+        for message in messages
+    )
@@ -1,3 +1,4 @@
+import httpx
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 from openai import AsyncOpenAI
@@ -6,23 +7,68 @@ from .config import env_config
 class LLMService:
     def __init__(self, api_key: str, base_url: str):
         self.client: AsyncOpenAI | None = None
+        self.http_client: httpx.AsyncClient | None = None
         self.connection_details = (api_key, base_url)
 
-    @asynccontextmanager
-    async def get_client(self) -> AsyncGenerator[AsyncOpenAI, None]:
+    async def connect(self) -> None:
         """
-        Returns the async OpenAI client.
+        Creates the process-wide OpenAI client on a pooled HTTP/2 connection,
+        so requests reuse open connections instead of a new TCP+TLS handshake each.
         """
 
-        openai_client = AsyncOpenAI(
+        if not self.client:
+            self.http_client = httpx.AsyncClient(
+                http2=env_config.LLM_HTTP2,
+                limits=httpx.Limits(
+                    max_connections=env_config.LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=env_config.LLM_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=env_config.LLM_KEEPALIVE_EXPIRY,
+                ),
+                timeout=httpx.Timeout(env_config.LLM_TIMEOUT, connect=5.0),
+            )
+            self.client = AsyncOpenAI(
                 api_key=self.connection_details[0],
-                base_url=self.connection_details[1]
+                base_url=self.connection_details[1],
+                http_client=self.http_client,
             )
-        
-        try:
-            yield openai_client
-        finally:
-            await openai_client.close()
-            print("OpenAI client context closed.")
+
+        print("OpenAI client connected.")
+
+    async def warm_up(self) -> None:
+        """
+        Opens a connection to the LLM endpoint ahead of the first chat request.
+        """
+
+        if not self.client:
+            await self.connect()
+        if self.client is not None:
+            try:
+                await self.client.models.list()
+            except Exception as e:
+                print(f"OpenAI client warm up failed: {str(e)}")
+
+    async def disconnect(self) -> None:
+        """
+        Closes the OpenAI client and its connection pool.
+        """
+
+        if self.client:
+            await self.client.close()
+            self.client = None
+            self.http_client = None
+
+        print("OpenAI client disconnected.")
+
+    @asynccontextmanager
+    async def get_client(self) -> AsyncGenerator[AsyncOpenAI, None]:
+        """
+        Returns the shared async OpenAI client.
+        """
+
+        if not self.client:
+            await self.connect()
+        assert self.client is not None
+
+        yield self.client
 
 llm_service = LLMService(api_key=env_config.GROQ_API_KEY, base_url=env_config.GROQ_BASE_URL)
@@ -0,0 +1,63 @@
+from typing import Dict, List, Tuple
+import numpy as np
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Fuses several rankings of IDs into one with Reciprocal Rank Fusion. Every ID scores
+    1 / (k + rank) per ranking it appears in, so only ranks matter and scores of
+    different retrievers don't have to be comparable.
+
+    This function accepts the following parameters:
+    - rankings: Lists of IDs, best first.
+    - k: Damping constant. Larger values flatten the difference between top ranks.
+    """
+
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+
+    return sorted(scores.items(), key=lambda entry: entry[1], reverse=True)
+
+
+def maximal_marginal_relevance(
+    relevance: np.ndarray, vectors: np.ndarray, k: int, lambda_mult: float
+) -> List[int]:
+    """
+    Selects k candidates with Maximal Marginal Relevance. Each step picks the candidate
+    with the best trade-off between its relevance and its cosine similarity to the
+    candidates already selected, so near-duplicates are skipped.
+
+    This function accepts the following parameters:
+    - relevance: Relevance score of every candidate, higher is better.
+    - vectors: Candidate vectors, one row per candidate.
+    - k: Number of candidates to select.
+    - lambda_mult: 1 ranks by relevance only, 0 by diversity only.
+
+    Returns the indices of the selected candidates, in selection order.
+    """
+
+    n = len(relevance)
+    if n <= 1 or k <= 0:
+        return list(range(min(n, max(k, 0))))
+
+    normalised = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    similarity = normalised @ normalised.T
+
+    selected = [int(np.argmax(relevance))]
+    # Highest similarity of every candidate to the selected ones.
+    redundancy = similarity[selected[0]].copy()
+    available = np.ones(n, dtype=bool)
+    available[selected[0]] = False
+
+    while len(selected) < min(k, n):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, similarity[best], out=redundancy)
+
+    return selected
@@ -0,0 +1,73 @@
+import re
+import zlib
+from collections import Counter
+from typing import List
+from qdrant_client.models import SparseVector
+
+# BM25 term frequency saturation and length normalisation. The IDF part of BM25 is
+# applied by Qdrant at query time (Modifier.IDF on the sparse vector), so the index
+# stays correct as chunks are added and deleted.
+K1 = 1.2
+B = 0.75
+# Average chunk length in tokens. The splitter produces chunks of up to 1000 characters.
+AVG_DOC_LENGTH = 150
+
+# Identifiers like part numbers, error codes and versions are kept as a single token
+# (e.g. 'err-4012', 'v2.3.1'), and their parts are indexed too.
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_./:#][a-z0-9]+)*")
+PART_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset(
+    """a an and are as at be but by for from has have he her his i if in into is it its
+    me my no not of on or our she so that the their them then there these they this to
+    was we were what when where which who will with you your""".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Splits a text into lowercase tokens without stopwords.
+    """
+
+    tokens: List[str] = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+
+        parts = PART_PATTERN.findall(token)
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if part not in STOPWORDS)
+
+    return tokens
+
+
+def token_index(token: str) -> int:
+    """
+    Maps a token to a stable sparse vector dimension.
+    """
+
+    return zlib.crc32(token.encode("utf-8"))
+
+
+def encode_document(text: str) -> SparseVector:
+    """
+    Encodes a chunk into a sparse vector of BM25 term weights, without IDF.
+    """
+
+    counts = Counter(token_index(token) for token in tokenize(text))
+    length_norm = K1 * (1 - B + B * sum(counts.values()) / AVG_DOC_LENGTH)
+
+    return SparseVector(
+        indices=list(counts),
+        values=[tf * (K1 + 1) / (tf + length_norm) for tf in counts.values()],
+    )
+
+
+def encode_query(text: str) -> SparseVector:
+    """
+    Encodes a query into a sparse vector with a weight of 1 per distinct token.
+    """
+
+    indices = list(dict.fromkeys(token_index(token) for token in tokenize(text)))
+    return SparseVector(indices=indices, values=[1.0] * len(indices))
@@ -0,0 +1,98 @@
+import asyncio
+import time
+from typing import AsyncGenerator, AsyncIterable, Dict, List, get_args
+import orjson
+from ..models.chat import ChatEvent
+
+# 'data: {"type":"<type>","content":' for every event type, so framing an event only
+# serializes its content. The frames match ChatEvent.model_dump_json().
+EVENT_PREFIXES: Dict[str, bytes] = {
+    event_type: b'data: {"type":' + orjson.dumps(event_type) + b',"content":'
+    for event_type in get_args(ChatEvent.model_fields["type"].annotation)
+}
+
+
+def sse_event(event_type: str, content: str) -> bytes:
+    """
+    Frames a chat event as a Server-Sent Event.
+    """
+
+    return EVENT_PREFIXES[event_type] + orjson.dumps(content) + b"}\n\n"
+
+
+async def coalesce_events(
+    events: AsyncIterable[ChatEvent], flush_interval: float, flush_bytes: int
+) -> AsyncGenerator[bytes, None]:
+    """
+    Frames chat events as Server-Sent Events, merging consecutive text deltas into one
+    event. The first delta is sent right away, so the time to first token is unchanged.
+    Later text is flushed once it reaches flush_bytes, flush_interval seconds after its
+    first delta, before any other event and at the end of the stream.
+
+    The events are read by a separate task into a queue, so the time-based flush also
+    happens while the model is stalled.
+
+    This function accepts the following parameters:
+    - events: The chat events to frame.
+    - flush_interval: Maximum seconds a delta waits in the buffer.
+    - flush_bytes: Buffer size in bytes (UTF-8) that triggers a flush.
+    """
+
+    queue: asyncio.Queue[ChatEvent | BaseException | None] = asyncio.Queue()
+
+    async def read() -> None:
+        try:
+            async for event in events:
+                queue.put_nowait(event)
+            queue.put_nowait(None)
+        except BaseException as e:
+            queue.put_nowait(e)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+
+    reader = asyncio.create_task(read())
+    buffer: List[str] = []
+    buffered_bytes = 0
+    deadline = 0.0
+    sent_text = False
+
+    try:
+        while True:
+            if not buffer:
+                item = await queue.get()
+            else:
+                try:
+                    item = await asyncio.wait_for(
+                        queue.get(), timeout=max(deadline - time.monotonic(), 0.0)
+                    )
+                except asyncio.TimeoutError:
+                    yield sse_event("text", "".join(buffer))
+                    buffer, buffered_bytes = [], 0
+                    continue
+
+            if isinstance(item, ChatEvent) and item.type == "text":
+                if not sent_text:
+                    sent_text = True
+                    yield sse_event("text", item.content)
+                    continue
+                if not buffer:
+                    deadline = time.monotonic() + flush_interval
+                buffer.append(item.content)
+                buffered_bytes += len(item.content.encode())
+                if buffered_bytes >= flush_bytes:
+                    yield sse_event("text", "".join(buffer))
+                    buffer, buffered_bytes = [], 0
+                continue
+
+            # Any other event, the end of the stream or an error ends the text run.
+            if buffer:
+                yield sse_event("text", "".join(buffer))
+                buffer, buffered_bytes = [], 0
+
+            if item is None:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield sse_event(item.type, item.content)
+    finally:
+        reader.cancel()
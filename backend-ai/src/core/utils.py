@@ -1,17 +1,9 @@
-import asyncio
-from langchain_ollama import OllamaEmbeddings
-from typing import List
-from .config import env_config
+from uuid import NAMESPACE_URL, uuid5
 
-embeddings = OllamaEmbeddings(
-    model=env_config.EMBEDDER_MODEL,
-    base_url="http://localhost:11434",
-)
 
-
-async def get_query_embeddings(user_query: str) -> List[float]:
+def get_document_id(user_id: str, file_name: str) -> str:
     """
-    Runs the synchronous, CPU-bound embedding function in a separate thread
-    to avoid blocking the main FastAPI event loop.
+    Returns the ID of a user's document. It is derived from the file name,
+    so re-uploading a file keeps its document ID.
     """
-    return await asyncio.to_thread(embeddings.embed_query, user_query)
+    return str(uuid5(NAMESPACE_URL, f"{user_id}/{file_name}"))
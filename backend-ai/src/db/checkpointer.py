@@ -0,0 +1,288 @@
+import time
+import zlib
+from typing import Any, AsyncIterator, Dict, Sequence, Tuple
+import ormsgpack
+import redis.asyncio as aioredis
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from ..core.config import env_config
+
+
+class RedisCheckpointSaver(BaseCheckpointSaver[int]):
+    """
+    LangGraph checkpointer that keeps the conversation state in Redis, so it is shared by
+    all API workers, survives restarts and doesn't grow the API process memory.
+
+    Every checkpoint is stored with its channel values as one zlib compressed msgpack
+    record. A sorted set per thread orders the checkpoints by creation. Only the last
+    CHECKPOINT_RETENTION checkpoints of a thread are kept, and all keys of a thread expire
+    CHECKPOINT_TTL seconds after its last write. Only the async interface is implemented,
+    since the graph is only run with astream.
+    """
+
+    def __init__(self, host: str = "localhost", port: int = 6379) -> None:
+        super().__init__()
+        self.aioredis_client: aioredis.Redis | None = None
+        self.connection_details = (host, port)
+
+    async def connect(self) -> None:
+        """
+        Establish the redis connection. Responses are not decoded, since the
+        checkpoints are stored as compressed bytes.
+        """
+
+        if not self.aioredis_client:
+            self.aioredis_client = aioredis.Redis(
+                host=self.connection_details[0],
+                port=self.connection_details[1],
+                db=0,
+            )
+
+        print("Redis Checkpointer connected.")
+
+    async def disconnect(self) -> None:
+        """
+        Disconnect the redis client.
+        """
+
+        if self.aioredis_client:
+            await self.aioredis_client.close()
+            self.aioredis_client = None
+
+        print("Redis Checkpointer disconnected.")
+
+    async def get_client(self) -> aioredis.Redis:
+        if not self.aioredis_client:
+            await self.connect()
+        assert self.aioredis_client is not None
+
+        return self.aioredis_client
+
+    def dumps(self, value: Any) -> bytes:
+        return zlib.compress(ormsgpack.packb(value))
+
+    def loads(self, data: bytes) -> Any:
+        return ormsgpack.unpackb(zlib.decompress(data))
+
+    async def load_tuple(
+        self, thread_id: str, checkpoint_ns: str, checkpoint_id: str
+    ) -> CheckpointTuple | None:
+        """
+        Loads a checkpoint with its pending writes.
+        """
+
+        client = await self.get_client()
+        pipeline = client.pipeline()
+        pipeline.get(f"checkpoint:{thread_id}:{checkpoint_ns}:{checkpoint_id}")
+        pipeline.hvals(f"checkpoint_writes:{thread_id}:{checkpoint_ns}:{checkpoint_id}")
+        record, writes = await pipeline.execute()
+        if record is None:
+            return None
+
+        checkpoint_type, checkpoint, metadata_type, metadata, parent_id = self.loads(record)
+        # Writes are returned in the order the tasks made them.
+        pending_writes = sorted((self.loads(write) for write in writes), key=lambda write: write[0])
+
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=self.serde.loads_typed((checkpoint_type, checkpoint)),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((value_type, value)))
+                for _, task_id, channel, value_type, value in pending_writes
+            ],
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+        )
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        """
+        Returns the checkpoint in the config, or the latest checkpoint of the thread.
+        """
+
+        thread_id: str = config["configurable"]["thread_id"]
+        checkpoint_ns: str = config["configurable"].get("checkpoint_ns", "")
+
+        checkpoint_id = get_checkpoint_id(config)
+        if not checkpoint_id:
+            client = await self.get_client()
+            latest = await client.zrange(f"checkpoints:{thread_id}:{checkpoint_ns}", -1, -1)
+            if not latest:
+                return None
+            checkpoint_id = latest[0].decode()
+
+        return await self.load_tuple(thread_id, checkpoint_ns, checkpoint_id)
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: Dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        """
+        Yields the retained checkpoints of the thread in the config, newest first.
+        """
+
+        if config is None:
+            raise ValueError("Listing checkpoints requires a thread_id.")
+
+        thread_id: str = config["configurable"]["thread_id"]
+        checkpoint_ns: str = config["configurable"].get("checkpoint_ns", "")
+        config_checkpoint_id = get_checkpoint_id(config)
+        before_checkpoint_id = get_checkpoint_id(before) if before else None
+
+        client = await self.get_client()
+        checkpoint_ids = await client.zrange(
+            f"checkpoints:{thread_id}:{checkpoint_ns}", 0, -1, desc=True
+        )
+
+        for raw_id in checkpoint_ids:
+            if limit is not None and limit <= 0:
+                break
+
+            checkpoint_id = raw_id.decode()
+            if config_checkpoint_id and checkpoint_id != config_checkpoint_id:
+                continue
+            if before_checkpoint_id and checkpoint_id >= before_checkpoint_id:
+                continue
+
+            checkpoint_tuple = await self.load_tuple(thread_id, checkpoint_ns, checkpoint_id)
+            if checkpoint_tuple is None:
+                continue
+            if filter and not all(
+                checkpoint_tuple.metadata.get(key) == value for key, value in filter.items()
+            ):
+                continue
+
+            if limit is not None:
+                limit -= 1
+            yield checkpoint_tuple
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """
+        Stores a checkpoint and drops the thread's checkpoints beyond the retention window.
+        """
+
+        thread_id: str = config["configurable"]["thread_id"]
+        checkpoint_ns: str = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = checkpoint["id"]
+        index_key = f"checkpoints:{thread_id}:{checkpoint_ns}"
+        checkpoint_key = f"checkpoint:{thread_id}:{checkpoint_ns}:{checkpoint_id}"
+
+        checkpoint_type, checkpoint_data = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_data = self.serde.dumps_typed(
+            get_checkpoint_metadata(config, metadata)
+        )
+        record = self.dumps(
+            [
+                checkpoint_type,
+                checkpoint_data,
+                metadata_type,
+                metadata_data,
+                config["configurable"].get("checkpoint_id"),
+            ]
+        )
+
+        client = await self.get_client()
+        pipeline = client.pipeline()
+        pipeline.set(checkpoint_key, record, ex=env_config.CHECKPOINT_TTL)
+        # Checkpoint IDs are time-ordered, so they sort lexicographically at equal scores.
+        pipeline.zadd(index_key, {checkpoint_id: 0})
+        pipeline.expire(index_key, env_config.CHECKPOINT_TTL)
+        pipeline.zcard(index_key)
+        size = (await pipeline.execute())[-1]
+
+        if size > env_config.CHECKPOINT_RETENTION:
+            expired = await client.zpopmin(index_key, size - env_config.CHECKPOINT_RETENTION)
+            expired_ids = [entry.decode() for entry, _ in expired]
+            await client.delete(
+                *[f"checkpoint:{thread_id}:{checkpoint_ns}:{entry}" for entry in expired_ids],
+                *[f"checkpoint_writes:{thread_id}:{checkpoint_ns}:{entry}" for entry in expired_ids],
+            )
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint_id,
+            }
+        }
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """
+        Stores the pending writes of a task for the checkpoint in the config.
+        """
+
+        thread_id: str = config["configurable"]["thread_id"]
+        checkpoint_ns: str = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id: str = config["configurable"]["checkpoint_id"]
+        writes_key = f"checkpoint_writes:{thread_id}:{checkpoint_ns}:{checkpoint_id}"
+
+        client = await self.get_client()
+        pipeline = client.pipeline()
+        for index, (channel, value) in enumerate(writes):
+            write_index = WRITES_IDX_MAP.get(channel, index)
+            value_type, value_data = self.serde.dumps_typed(value)
+            field = f"{task_id}:{write_index}"
+            write = self.dumps([time.time_ns(), task_id, channel, value_type, value_data])
+
+            # Regular writes of a task are stored once, special writes (errors,
+            # interrupts) replace the earlier ones.
+            if write_index >= 0:
+                pipeline.hsetnx(writes_key, field, write)
+            else:
+                pipeline.hset(writes_key, field, write)
+        pipeline.expire(writes_key, env_config.CHECKPOINT_TTL)
+        await pipeline.execute()
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        """
+        Deletes all checkpoints and writes of the thread.
+        """
+
+        client = await self.get_client()
+        for prefix in ("checkpoints", "checkpoint", "checkpoint_writes"):
+            keys = [key async for key in client.scan_iter(match=f"{prefix}:{thread_id}:*", count=1000)]
+            if keys:
+                await client.delete(*keys)
+
+
+checkpoint_saver = RedisCheckpointSaver()
@@ -0,0 +1,150 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import zlib
+from typing import Dict, Iterable, List
+import orjson
+from langchain_core.documents import Document
+from ..core.config import env_config
+
+
+class ChunkStore:
+    """
+    Key-value store for chunk texts, keyed by the Qdrant point ID.
+
+    Used when RAG_PAYLOAD_MODE is 'external', so that Qdrant points only carry the filter
+    fields. Records are zlib compressed JSON in a memory-mapped SQLite file in WAL mode,
+    which lets the API and the workers on the same host read and write it concurrently.
+    The file is on a volume shared by all of them, at an absolute path.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.connection: sqlite3.Connection | None = None
+        self.path = path
+        self.lock = threading.Lock()
+
+    def connect(self, create: bool = False) -> None:
+        """
+        Opens the SQLite file and creates the chunks table. Only the API creates the file
+        (with `create`). A worker that doesn't find it isn't on the API's volume, and
+        fails instead of keeping the chunk texts to itself.
+        """
+
+        if not self.connection:
+            if not os.path.isabs(self.path):
+                raise ValueError(
+                    f"CHUNK_STORE_PATH must be an absolute path on a volume shared by the "
+                    f"API and the workers, got '{self.path}'."
+                )
+            if create:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            elif not os.path.exists(self.path):
+                raise FileNotFoundError(
+                    f"Chunk store '{self.path}' not found. The workers must share "
+                    f"CHUNK_STORE_PATH with the API, which creates it on startup."
+                )
+
+            self.connection = sqlite3.connect(
+                self.path, check_same_thread=False, isolation_level=None
+            )
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute(f"PRAGMA mmap_size={env_config.CHUNK_STORE_MMAP_SIZE}")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS chunks (id TEXT PRIMARY KEY, data BLOB NOT NULL) WITHOUT ROWID"
+            )
+
+        print("Chunk store connected.")
+
+    def disconnect(self) -> None:
+        """
+        Closes the SQLite connection.
+        """
+
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+
+        print("Chunk store disconnected.")
+
+    def put_many(self, ids: List[str], documents: List[Document]) -> None:
+        """
+        Stores the text and metadata of the given documents under their point IDs.
+        """
+
+        if not self.connection:
+            self.connect()
+        if self.connection is not None:
+            rows = [
+                (
+                    chunk_id,
+                    zlib.compress(
+                        orjson.dumps(
+                            {"text": document.page_content, "metadata": document.metadata}
+                        )
+                    ),
+                )
+                for chunk_id, document in zip(ids, documents)
+            ]
+
+            with self.lock:
+                self.connection.execute("BEGIN")
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO chunks (id, data) VALUES (?, ?)", rows
+                )
+                self.connection.execute("COMMIT")
+
+    def get_many(self, ids: Iterable[str]) -> Dict[str, Document]:
+        """
+        Fetches the documents stored under the given point IDs in one query.
+        Missing IDs are left out of the result.
+        """
+
+        ids = [str(chunk_id) for chunk_id in ids]
+        documents: Dict[str, Document] = {}
+
+        if not ids:
+            return documents
+
+        if not self.connection:
+            self.connect()
+        if self.connection is not None:
+            placeholders = ",".join("?" * len(ids))
+            with self.lock:
+                rows = self.connection.execute(
+                    f"SELECT id, data FROM chunks WHERE id IN ({placeholders})", ids
+                ).fetchall()
+
+            for chunk_id, data in rows:
+                record = orjson.loads(zlib.decompress(data))
+                documents[chunk_id] = Document(
+                    page_content=record["text"], metadata=record["metadata"]
+                )
+
+        return documents
+
+    async def get_many_async(self, ids: Iterable[str]) -> Dict[str, Document]:
+        """
+        Fetches the documents stored under the given point IDs on a separate thread.
+        """
+
+        return await asyncio.to_thread(self.get_many, list(ids))
+
+    def delete_many(self, ids: Iterable[str]) -> None:
+        """
+        Deletes the documents stored under the given point IDs.
+        """
+
+        if not self.connection:
+            self.connect()
+        if self.connection is not None:
+            with self.lock:
+                self.connection.execute("BEGIN")
+                self.connection.executemany(
+                    "DELETE FROM chunks WHERE id = ?", [(str(chunk_id),) for chunk_id in ids]
+                )
+                self.connection.execute("COMMIT")
+
+
+chunk_store = ChunkStore(env_config.CHUNK_STORE_PATH)
@@ -1,7 +1,9 @@
 import asyncio
+import re
+import time
 from contextlib import asynccontextmanager
-from typing import Any, AsyncGenerator, Dict
-from mem0 import Memory, AsyncMemory
+from typing import Any, AsyncGenerator, Dict, List, Set, Tuple
+from mem0 import AsyncMemory
 from mem0.configs.base import (
     MemoryConfig,
     VectorStoreConfig,
@@ -12,6 +14,16 @@ from mem0.configs.base import (
 from mem0.graphs.configs import Neo4jConfig
 from openai.types.responses import ResponseInputParam
 from ..core.config import env_config
+from ..core.embedder import get_embedder
+
+
+def normalise(text: str) -> str:
+    """
+    Lowercases the text and separates its words by single spaces,
+    so entity names like 'new_york' match 'New York' in a query.
+    """
+
+    return " ".join(re.findall(r"[^\W_]+", text.lower()))
 
 
 class Mem0Service:
@@ -23,7 +35,7 @@ class Mem0Service:
                     "collection_name": env_config.MEM0_COLLECTION_NAME,
                     "host": "localhost",
                     "port": 6333,
-                    "embedding_model_dims": 768,
+                    "embedding_model_dims": env_config.EMBEDDER_DIMS,
                 },
             ),
             graph_store=GraphStoreConfig(
@@ -43,44 +55,250 @@ class Mem0Service:
                     "api_key": env_config.GROQ_API_KEY,
                 },
             ),
+            # Share the process-wide embedder so mem0 follows EMBEDDER_BACKEND.
             embedder=EmbedderConfig(
-                provider="ollama",
-                config={
-                    "model": env_config.EMBEDDER_MODEL,
-                    "ollama_base_url": "http://localhost:11434",
-                },
+                provider="langchain",
+                config={"model": get_embedder()},
             ),
         )
 
-    def _search_sync(self, user_query: str, user_id: str) -> Dict[str, Any]:
-        mem0_client = Memory(config=self.config)
-        return mem0_client.search(query=user_query, user_id=user_id)
+        self.memory: AsyncMemory | None = None
+        self.lock = asyncio.Lock()
+        # Entity names of the users' graphs and when they were fetched.
+        self.entities: Dict[str, Tuple[int | None, float, Set[str]]] = {}
+        # Per-tier counters of the searches.
+        self.searches = 0
+        self.graph_searches = 0
+        self.vector_seconds = 0.0
+        self.graph_seconds = 0.0
+
+    async def connect(self) -> None:
+        """
+        Creates the process-wide mem0 client. Its Qdrant client, Neo4j driver, LLM client
+        and embedder are built once and pooled across requests. Building it verifies the
+        memory collection, so this runs on a separate thread.
+        """
+
+        async with self.lock:
+            if not self.memory:
+                self.memory = await asyncio.to_thread(AsyncMemory, config=self.config)
+
+        print("Mem0 client connected.")
+
+    async def disconnect(self) -> None:
+        """
+        Closes the connections of the mem0 client.
+        """
+
+        if self.memory:
+            memory, self.memory = self.memory, None
+            try:
+                if memory.graph is not None:
+                    await asyncio.to_thread(memory.graph.graph.close)
+                await asyncio.to_thread(memory.vector_store.client.close)
+            except Exception as e:
+                print(f"Error while closing the mem0 client: {str(e)}")
+
+        print("Mem0 client disconnected.")
+
+    async def health_check(self) -> bool:
+        """
+        Checks that the Qdrant and Neo4j connections of the mem0 client work.
+        """
+
+        if self.memory is None:
+            return False
+
+        try:
+            await asyncio.to_thread(self.memory.vector_store.client.get_collections)
+            if self.memory.graph is not None:
+                await asyncio.to_thread(self.memory.graph.graph.query, "RETURN 1")
+        except Exception as e:
+            print(f"Mem0 health check failed: {str(e)}")
+            return False
+
+        return True
 
     @asynccontextmanager
     async def get_client(self) -> AsyncGenerator[AsyncMemory, None]:
         """
-        An async context manager that provides a Mem0 client instance.
+        An async context manager that provides the shared Mem0 client instance.
+        If a call fails on a broken connection, the client is rebuilt on next use.
+        """
+
+        if not self.memory:
+            await self.connect()
+        assert self.memory is not None
+
+        try:
+            yield self.memory
+        except Exception:
+            if not await self.health_check():
+                print("Mem0 client unhealthy. It will be rebuilt on next use.")
+                await self.disconnect()
+            raise
+
+    async def search_vector_tier(
+        self,
+        memory: AsyncMemory,
+        user_query: str,
+        user_id: str,
+        query_embedding: List[float] | None,
+        limit: int,
+    ) -> List[Dict[str, Any]]:
+        """
+        Searches the memories of the user in Qdrant, reusing the query embedding if given.
+        """
+
+        if query_embedding is None:
+            query_embedding = await asyncio.to_thread(
+                memory.embedding_model.embed, user_query, "search"
+            )
+
+        hits = await asyncio.to_thread(
+            memory.vector_store.search,
+            query=user_query,
+            vectors=query_embedding,
+            limit=limit,
+            filters={"user_id": user_id},
+        )
+
+        return [
+            {
+                "id": hit.id,
+                "memory": hit.payload.get("data", ""),
+                "score": hit.score,
+                "created_at": hit.payload.get("created_at"),
+                "updated_at": hit.payload.get("updated_at"),
+            }
+            for hit in hits
+        ]
+
+    async def get_entities(
+        self, memory: AsyncMemory, user_id: str, memory_version: int | None
+    ) -> Set[str]:
+        """
+        Returns the entity names in the user's graph, as lowercase words separated by
+        spaces. They are cached per version of the user's memories, which the memory
+        worker bumps after writing to the graph, for at most MEMORY_ENTITY_CACHE_TTL seconds.
         """
 
-        mem0_client = AsyncMemory(config=self.config)
+        cached = self.entities.get(user_id)
+        if (
+            cached is not None
+            and cached[0] == memory_version
+            and time.monotonic() - cached[1] < env_config.MEMORY_ENTITY_CACHE_TTL
+        ):
+            return cached[2]
+
         try:
-            yield mem0_client
-        finally:
-            print("Mem0 client context closed.")
+            rows = await asyncio.to_thread(
+                memory.graph.graph.query,
+                "MATCH (n {user_id: $user_id}) RETURN DISTINCT n.name AS name",
+                params={"user_id": user_id},
+            )
+        except Exception as e:
+            print(f"Error while fetching the graph entities of user {user_id}: {str(e)}")
+            return set()
 
-    async def search_memories(self, user_query: str, user_id: str):
+        # The user's own node stands for 'I' and 'me' in the graph, queries never name it.
+        entities = {
+            normalise(str(row["name"]))
+            for row in rows
+            if row.get("name") and row["name"] != user_id
+        }
+        self.entities.pop(user_id, None)
+        self.entities[user_id] = (memory_version, time.monotonic(), entities)
+        if len(self.entities) > env_config.MEMORY_CACHE_CAPACITY:
+            del self.entities[next(iter(self.entities))]
+
+        return entities
+
+    async def search_memories(
+        self,
+        user_query: str,
+        user_id: str,
+        query_embedding: List[float] | None = None,
+        limit: int = 100,
+        memory_version: int | None = None,
+    ) -> Dict[str, Any]:
         """
-        Searches for memories of a specific user based on their query.
+        Searches for memories of a specific user based on their query. The version of the
+        user's memories keys the cache of their graph entities.
+
+        The memories in Qdrant are searched first. With the 'tiered' MEMORY_GRAPH_POLICY,
+        the graph search, which costs an LLM call for entity extraction and a Neo4j
+        traversal, only runs if the best memory scores below MEMORY_GRAPH_SCORE_THRESHOLD
+        or the query names an entity of the user's graph.
         """
 
-        return await asyncio.to_thread(self._search_sync, user_query, user_id)
+        async with self.get_client() as memory:
+            tiered = memory.graph is not None and env_config.MEMORY_GRAPH_POLICY == "tiered"
+
+            start = time.perf_counter()
+            if tiered:
+                results, entities = await asyncio.gather(
+                    self.search_vector_tier(memory, user_query, user_id, query_embedding, limit),
+                    self.get_entities(memory, user_id, memory_version),
+                )
+            else:
+                results = await self.search_vector_tier(
+                    memory, user_query, user_id, query_embedding, limit
+                )
+                entities = set()
+            vector_seconds = time.perf_counter() - start
+
+            top_score = max((entry["score"] for entry in results), default=0.0)
+            query = f" {normalise(user_query)} "
+
+            graph_reason = None
+            if memory.graph is not None and not tiered:
+                graph_reason = "policy"
+            elif tiered and top_score < env_config.MEMORY_GRAPH_SCORE_THRESHOLD:
+                graph_reason = f"top score {top_score:.2f}"
+            elif tiered:
+                mentioned = next((name for name in entities if f" {name} " in query), None)
+                if mentioned is not None:
+                    graph_reason = f"mentions '{mentioned}'"
+
+            relations: List[Dict[str, Any]] = []
+            graph_seconds = 0.0
+            if graph_reason is not None:
+                assert memory.graph is not None
+                start = time.perf_counter()
+                try:
+                    relations = await asyncio.to_thread(
+                        memory.graph.search, user_query, {"user_id": user_id}, limit
+                    )
+                except Exception as e:
+                    # The memories alone still make a useful context.
+                    print(f"Error while searching the memory graph: {str(e)}")
+                graph_seconds = time.perf_counter() - start
+
+        self.searches += 1
+        self.vector_seconds += vector_seconds
+        if graph_reason is not None:
+            self.graph_searches += 1
+            self.graph_seconds += graph_seconds
+
+        print(
+            f"Memory search: vector tier {vector_seconds * 1000:.0f} ms, {len(results)} memories "
+            f"(top score {top_score:.2f}); "
+            + (
+                f"graph tier {graph_seconds * 1000:.0f} ms, {len(relations)} relations ({graph_reason}). "
+                if graph_reason is not None
+                else "graph tier skipped. "
+            )
+            + f"Graph searched in {self.graph_searches}/{self.searches} searches."
+        )
+
+        return {"results": results, "relations": relations}
 
     async def add_memories(self, user_id: str, messages: ResponseInputParam) -> None:
         """
         Adds memories about the user based on the current conversation.
         """
 
-        # We perform this operation using async client as it doesn't return anything.
         async with self.get_client() as memory:
             await memory.add(user_id=user_id, messages=messages)
 
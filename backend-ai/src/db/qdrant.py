@@ -0,0 +1,274 @@
+from typing import Any, Dict, Iterator, List
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    Filter,
+    FilterSelector,
+    CreateAlias,
+    CreateAliasOperation,
+    DeleteAlias,
+    DeleteAliasOperation,
+    Distance,
+    Modifier,
+    PayloadSchemaType,
+    SparseVectorParams,
+    VectorParams,
+)
+from ..core.config import env_config
+from ..core.sparse import encode_document
+
+# Name of the BM25 sparse vector. The dense vector stays unnamed, so the layout
+# LangChain's QdrantVectorStore expects is kept.
+SPARSE_VECTOR_NAME = "bm25"
+
+# Payload fields that retrieval filters on. These are indexed on every RAG collection.
+PAYLOAD_INDEXES = {
+    "metadata.user_id": PayloadSchemaType.KEYWORD,
+    "metadata.batch_id": PayloadSchemaType.KEYWORD,
+    "metadata.document_id": PayloadSchemaType.KEYWORD,
+}
+
+# Metadata kept in the point payload when RAG_PAYLOAD_MODE is 'external'.
+COMPACT_METADATA_FIELDS = (
+    "user_id",
+    "batch_id",
+    "document_id",
+    "page",
+    "page_label",
+    "page_hash",
+    "file_name",
+    "start_index",
+)
+
+
+def build_payload(text: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Builds the point payload in the layout LangChain's QdrantVectorStore reads.
+    In 'external' payload mode, the text is left out and only the filter fields are kept.
+    """
+
+    if env_config.RAG_PAYLOAD_MODE == "external":
+        return {
+            "metadata": {
+                field: metadata[field]
+                for field in COMPACT_METADATA_FIELDS
+                if field in metadata
+            }
+        }
+
+    return {"page_content": text, "metadata": metadata}
+
+
+def build_vector(vector: List[float], text: str, sparse: bool) -> List[float] | Dict[str, Any]:
+    """
+    Builds the point vector. With `sparse`, the BM25 sparse vector of the text is added
+    next to the dense vector.
+    """
+
+    if sparse:
+        return {"": vector, SPARSE_VECTOR_NAME: encode_document(text)}
+
+    return vector
+
+
+class QdrantService:
+    def __init__(self, host: str = "localhost", port: int = 6333) -> None:
+        self.client: QdrantClient | None = None
+        self.connection_details = (host, port)
+
+    def connect(self) -> None:
+        """
+        Connects the Qdrant client.
+        """
+
+        if not self.client:
+            self.client = QdrantClient(
+                host=self.connection_details[0], port=self.connection_details[1]
+            )
+
+        print("Qdrant client connected.")
+
+    def disconnect(self) -> None:
+        """
+        Disconnects the Qdrant client.
+        """
+
+        if self.client:
+            self.client.close()
+            self.client = None
+
+        print("Qdrant client disconnected.")
+
+    def resolve_collection(self, name: str) -> str:
+        """
+        Returns the collection an alias points to. If `name` is not an alias,
+        it is returned as is.
+        """
+
+        if not self.client:
+            self.connect()
+        if self.client is not None:
+            for alias in self.client.get_aliases().aliases:
+                if alias.alias_name == name:
+                    return alias.collection_name
+
+        return name
+
+    def create_collection(self, name: str, dims: int) -> None:
+        """
+        Creates a RAG collection in the layout LangChain's QdrantVectorStore expects
+        (a single unnamed cosine vector) and indexes the filter fields.
+        A BM25 sparse vector is added for keyword search, with the IDF computed by Qdrant.
+        Payloads are kept on disk, since they are only read for the top-k hits.
+        """
+
+        if not self.client:
+            self.connect()
+        if self.client is not None:
+            self.client.create_collection(
+                collection_name=name,
+                vectors_config=VectorParams(size=dims, distance=Distance.COSINE),
+                sparse_vectors_config={
+                    SPARSE_VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF)
+                },
+                on_disk_payload=True,
+            )
+
+            self.create_payload_indexes(name)
+
+    def create_payload_indexes(self, name: str) -> None:
+        """
+        Indexes the filter fields of a RAG collection. Existing indexes are left as they are.
+        """
+
+        if not self.client:
+            self.connect()
+        if self.client is not None:
+            for field, schema in PAYLOAD_INDEXES.items():
+                self.client.create_payload_index(
+                    collection_name=name, field_name=field, field_schema=schema
+                )
+
+    def has_sparse_vectors(self, name: str) -> bool:
+        """
+        Checks whether a collection has the BM25 sparse vector. Collections created
+        before it was added only get it by re-embedding into a new collection.
+        """
+
+        if not self.client:
+            self.connect()
+        if self.client is not None:
+            sparse_vectors = self.client.get_collection(name).config.params.sparse_vectors
+            return SPARSE_VECTOR_NAME in (sparse_vectors or {})
+
+        return False
+
+    def ensure_collection(self, name: str, dims: int) -> None:
+        """
+        Creates the RAG collection if it doesn't exist yet.
+        """
+
+        if not self.client:
+            self.connect()
+        if self.client is not None and not self.client.collection_exists(name):
+            self.create_collection(name, dims=dims)
+
+    def drop_legacy_collection(self, name: str, replacement: str, missing: int = 0) -> None:
+        """
+        Drops the concrete collection `name` (the layout before the first migration), so
+        that an alias can take its name. The collection is only dropped if `replacement`
+        holds all of its points but the `missing` ones, otherwise a ValueError is raised
+        and nothing is changed. Searches fail until the alias is created.
+        """
+
+        if not self.client:
+            self.connect()
+        if self.client is not None:
+            expected = self.client.count(collection_name=name, exact=True).count - missing
+            actual = self.client.count(collection_name=replacement, exact=True).count
+            if actual < expected:
+                raise ValueError(
+                    f"Collection '{replacement}' has {actual} points, expected at least {expected}. "
+                    f"The legacy collection '{name}' was kept."
+                )
+
+            print(f"Dropping legacy collection '{name}' to replace it with an alias.")
+            self.client.delete_collection(collection_name=name)
+
+    def point_alias(self, alias: str, collection: str) -> None:
+        """
+        Atomically points `alias` to `collection`. If `alias` is still a concrete
+        collection, it must be dropped with `drop_legacy_collection` first.
+        """
+
+        if not self.client:
+            self.connect()
+        if self.client is not None:
+            self.client.update_collection_aliases(
+                change_aliases_operations=[
+                    DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias)),
+                    CreateAliasOperation(
+                        create_alias=CreateAlias(
+                            collection_name=collection, alias_name=alias
+                        )
+                    ),
+                ]
+            )
+
+    def scroll_ids(
+        self, collection: str, points_filter: Filter, page_size: int = 10000
+    ) -> Iterator[List[str]]:
+        """
+        Yields the IDs of the points matching the filter, page by page, without payloads or vectors.
+        """
+
+        if not self.client:
+            self.connect()
+        if self.client is not None:
+            offset = None
+            while True:
+                points, offset = self.client.scroll(
+                    collection_name=collection,
+                    scroll_filter=points_filter,
+                    limit=page_size,
+                    offset=offset,
+                    with_payload=False,
+                    with_vectors=False,
+                )
+                if points:
+                    yield [str(point.id) for point in points]
+                if offset is None:
+                    break
+
+    def set_metadata(
+        self, collection: str, points_filter: Filter, metadata: Dict[str, Any]
+    ) -> None:
+        """
+        Sets the given metadata fields on all points matching the filter.
+        """
+
+        if not self.client:
+            self.connect()
+        if self.client is not None:
+            self.client.set_payload(
+                collection_name=collection,
+                payload=metadata,
+                points=FilterSelector(filter=points_filter),
+                key="metadata",
+            )
+
+    def delete_points(self, collection: str, points_filter: Filter) -> None:
+        """
+        Deletes all points matching the filter in a single request.
+        """
+
+        if not self.client:
+            self.connect()
+        if self.client is not None:
+            self.client.delete(
+                collection_name=collection,
+                points_selector=FilterSelector(filter=points_filter),
+                wait=True,
+            )
+
+
+qdrant_service = QdrantService()
@@ -1,6 +1,6 @@
-from fastapi import UploadFile, File
+from fastapi import UploadFile, File, Form
 from pydantic import BaseModel
-from typing import Any, Optional, TypeVar, Generic
+from typing import Any, Dict, List, Optional, TypeVar, Generic
 
 T = TypeVar("T")
 
@@ -23,10 +23,21 @@ class AuthRequestBody(BaseModel):
 class IngestPayload(BaseModel):
     message: str
     batch_id: str
+    documents: Dict[str, str] = {}
 
 class ChatRequestBody(BaseModel):
     query: str
+    # Limit retrieval to these batches and/or documents. Empty means all of the user's documents.
+    batch_ids: List[str] = []
+    document_ids: List[str] = []
 
 class ChatForm:
-    def __init__(self, audio: UploadFile = File(...)):
+    def __init__(
+        self,
+        audio: UploadFile = File(...),
+        batch_ids: List[str] = Form([]),
+        document_ids: List[str] = Form([]),
+    ):
         self.audio = audio
+        self.batch_ids = batch_ids
+        self.document_ids = document_ids
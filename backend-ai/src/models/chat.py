@@ -1,30 +1,54 @@
 from websockets import ClientConnection
 from asyncio import Task
-from operator import add
 from openai.types.responses import ResponseInputParam
 from pydantic import BaseModel
-from typing_extensions import TypedDict, Literal, Optional, Annotated
+from typing_extensions import Any, Dict, List, TypedDict, Literal, Optional, Annotated, NotRequired
 from dataclasses import dataclass
+from ..core.history import merge_messages
 
 
 class State(TypedDict):
     user_id: str
     user_query: str
-    messages: Annotated[ResponseInputParam, add]
+    messages: Annotated[ResponseInputParam, merge_messages]
+    # Running summary of the turns dropped from messages.
+    summary: NotRequired[str]
     query_type: Optional[Literal["NORMAL", "RETRIEVAL"]]
     is_voice: bool
+    batch_ids: List[str]
+    document_ids: List[str]
 
 
 class ChatEvent(BaseModel):
-    type: Literal["status", "transcription", "text", "audio", "error"]
+    type: Literal["status", "transcription", "text", "audio", "skipped", "stream", "error"]
     content: str
 
 
+class RetrievedChunk(BaseModel):
+    id: str
+    text: str
+    score: float
+    metadata: Dict[str, Any]
+    # Whether the score is an RRF score of the hybrid search rather than a cosine similarity.
+    fused: bool = False
+
+
+class MemoryJob(BaseModel):
+    user_id: str
+
+
 class StreamPayload(BaseModel):
     data: str
     status: Optional[Literal["Finished", "In Progress"]]
 
 
+@dataclass
+class Prefetch:
+    query_embedding: Task
+    documents: Task
+    memories: Task
+
+
 @dataclass
 class TTSClient:
     websocket: ClientConnection
@@ -17,6 +17,40 @@ class EmbeddingPayload(BaseModel):
 class CleanupJob(BaseModel):
     batch_id: str
 
+
+class DeletionJob(BaseModel):
+    user_id: str
+    batch_id: str
+    field: Literal["batch_id", "document_id"]
+    value: str
+
+
+class ReembeddingJob(BaseModel):
+    batch_id: str
+    backend: str
+    model: str
+    dims: int
+    target_collection: str
+
+
+class MigrationDetails(BaseModel):
+    batch_id: str
+    backend: str
+    model: str
+    dims: int
+    collection: str
+
+
+class EmbedderDetails(BaseModel):
+    backend: str
+    model: str
+    dims: int
+
+
+class DocumentVersion(BaseModel):
+    page_hashes: Dict[int, str]
+    unchanged_pages: List[int]
+
 class EmbeddingJob(BaseModel):
     user_id: str
     batch_id: str
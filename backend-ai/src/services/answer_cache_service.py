@@ -0,0 +1,176 @@
+import hashlib
+import time
+from typing import List
+from uuid import uuid4
+import numpy as np
+import orjson
+import redis.asyncio as aioredis
+from ..core.config import env_config
+from .embedder_service import embedder_service
+
+
+class AnswerCacheService:
+    """
+    Per-user semantic cache of document-grounded answers.
+
+    Entries are looked up by the cosine similarity of their query embedding to the new
+    query. They are scoped to the version of the user's document set and the embedder
+    model, so ingesting or deleting documents makes earlier answers unreachable.
+    Every entry also records a digest of the conversation turn before its query, and
+    only answers the same query after the same turn. Follow-ups like "and what about
+    section 3?" mean something else in another conversation.
+    Each scope keeps its query vectors and answers in two hashes and the last use of
+    every entry in a sorted set, which drives the capacity-based (LRU) eviction.
+    """
+
+    def __init__(self, host: str = "localhost", port: int = 6379) -> None:
+        self.aioredis_client: aioredis.Redis | None = None
+        self.connection_details = (host, port)
+        self.hits = 0
+        self.misses = 0
+
+    async def connect(self) -> None:
+        """
+        Establish the redis connection. Responses are not decoded, since the
+        query vectors are stored as raw bytes.
+        """
+
+        if not self.aioredis_client:
+            self.aioredis_client = aioredis.Redis(
+                host=self.connection_details[0],
+                port=self.connection_details[1],
+                db=0,
+            )
+
+        print("Redis Answer Cache Service connected.")
+
+    async def disconnect(self) -> None:
+        """
+        Disconnect the redis client.
+        """
+
+        if self.aioredis_client:
+            await self.aioredis_client.close()
+            self.aioredis_client = None
+
+        print("Redis Answer Cache Service disconnected.")
+
+    async def get_scope(
+        self,
+        user_id: str,
+        batch_ids: List[str] | None = None,
+        document_ids: List[str] | None = None,
+    ) -> str:
+        """
+        Returns the cache scope of the user's current document set. Answers to queries
+        limited to certain batches or documents get a scope of their own.
+        """
+
+        version = 0
+        if not self.aioredis_client:
+            await self.connect()
+        if self.aioredis_client is not None:
+            version = int(await self.aioredis_client.get(f"docset:{user_id}") or 0)
+
+        embedder = await embedder_service.get_rag_embedder_async()
+        scope = f"{user_id}:{version}:{embedder.model}"
+        if batch_ids or document_ids:
+            filters = orjson.dumps([sorted(batch_ids or []), sorted(document_ids or [])])
+            scope += f":{hashlib.sha1(filters).hexdigest()[:16]}"
+
+        return scope
+
+    async def lookup(
+        self, scope: str, query_embedding: List[float], context: str = ""
+    ) -> str | None:
+        """
+        Returns the cached answer to the most similar query in the scope that followed
+        the same conversation context, if it is similar enough and has not expired.
+        """
+
+        if not self.aioredis_client:
+            await self.connect()
+        if self.aioredis_client is None:
+            return None
+
+        vectors = await self.aioredis_client.hgetall(f"answers:{scope}:vectors")
+        if not vectors:
+            self.misses += 1
+            return None
+
+        ids = list(vectors)
+        matrix = np.frombuffer(b"".join(vectors[entry_id] for entry_id in ids), dtype=np.float32)
+        matrix = matrix.reshape(len(ids), -1)
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        similarities = (matrix @ query) / (
+            np.linalg.norm(matrix, axis=1) * np.linalg.norm(query) + 1e-12
+        )
+        candidates = [
+            int(i)
+            for i in np.argsort(similarities)[::-1]
+            if similarities[i] >= env_config.ANSWER_CACHE_THRESHOLD
+        ]
+
+        if candidates:
+            entries = await self.aioredis_client.hmget(
+                f"answers:{scope}:texts", [ids[i] for i in candidates]
+            )
+            for i, entry in zip(candidates, entries):
+                if entry is None:
+                    continue
+                record = orjson.loads(entry)
+                if (
+                    record.get("context", "") == context
+                    and time.time() - record["created"] < env_config.ANSWER_CACHE_TTL
+                ):
+                    await self.aioredis_client.zadd(f"answers:{scope}:lru", {ids[i]: time.time()})
+                    self.hits += 1
+                    print(
+                        f"Answer cache hit (similarity {similarities[i]:.3f}). "
+                        f"Hits: {self.hits}, misses: {self.misses}."
+                    )
+                    return record["answer"]
+
+        self.misses += 1
+        return None
+
+    async def store(
+        self, scope: str, query_embedding: List[float], answer: str, context: str = ""
+    ) -> None:
+        """
+        Caches an answer in the scope along with the digest of the conversation context
+        of its query, and evicts the least recently used entries beyond the capacity.
+        """
+
+        if not self.aioredis_client:
+            await self.connect()
+        if self.aioredis_client is None:
+            return
+
+        entry_id = str(uuid4())
+        now = time.time()
+        keys = [f"answers:{scope}:vectors", f"answers:{scope}:texts", f"answers:{scope}:lru"]
+
+        pipeline = self.aioredis_client.pipeline()
+        pipeline.hset(keys[0], entry_id, np.asarray(query_embedding, dtype=np.float32).tobytes())
+        pipeline.hset(keys[1], entry_id, orjson.dumps({"answer": answer, "created": now, "context": context}))
+        pipeline.zadd(keys[2], {entry_id: now})
+        # Scopes of older document set versions expire on their own.
+        for key in keys:
+            pipeline.expire(key, env_config.ANSWER_CACHE_TTL)
+        pipeline.zcard(keys[2])
+        size = (await pipeline.execute())[-1]
+
+        if size > env_config.ANSWER_CACHE_CAPACITY:
+            evicted = await self.aioredis_client.zpopmin(
+                keys[2], size - env_config.ANSWER_CACHE_CAPACITY
+            )
+            evicted_ids = [entry for entry, _ in evicted]
+            pipeline = self.aioredis_client.pipeline()
+            pipeline.hdel(keys[0], *evicted_ids)
+            pipeline.hdel(keys[1], *evicted_ids)
+            await pipeline.execute()
+
+
+answer_cache_service = AnswerCacheService()
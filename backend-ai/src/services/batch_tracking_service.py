@@ -1,8 +1,13 @@
 import redis
 import redis.asyncio as aioredis
-from typing import Literal
+from typing import Dict, Iterable, Literal, Set
 from uuid import uuid4
-from ..models.ingestion import BatchDetails
+from ..models.ingestion import (
+    BatchDetails,
+    DocumentVersion,
+    EmbedderDetails,
+    MigrationDetails,
+)
 
 
 class BatchTrackingService:
@@ -159,6 +164,230 @@ class BatchTrackingService:
                 status=batch_data.get("status", "NONE"),
             )
 
+    def mark_batch_completed(self, batch_id: str) -> bool:
+        """
+        Atomically flags the batch as completed. Only the first caller gets True, so a
+        batch finished by the chunking and the embedding worker at once completes once.
+        """
+
+        if not self.redis_client:
+            self.connect()
+        if self.redis_client is not None:
+            return bool(self.redis_client.hsetnx(f"batch:{batch_id}", "completed", 1))
+
+        return False
+
+    def get_page_hashes(self, document_id: str) -> Dict[int, str]:
+        """
+        Retrieves the content hash of every page of the last ingested version of a document.
+        """
+
+        if not self.redis_client:
+            self.connect()
+        if self.redis_client is not None:
+            data = self.redis_client.hgetall(f"pages:{document_id}")
+            return {int(page): page_hash for page, page_hash in data.items()}  # type: ignore
+
+        return {}
+
+    def set_page_hashes(self, document_id: str, page_hashes: Dict[int, str]) -> None:
+        """
+        Replaces the stored page hashes of a document.
+        """
+
+        if not self.redis_client:
+            self.connect()
+        if self.redis_client is not None:
+            pipeline = self.redis_client.pipeline()
+            pipeline.delete(f"pages:{document_id}")
+            if page_hashes:
+                pipeline.hset(f"pages:{document_id}", mapping=page_hashes)  # type: ignore
+            pipeline.execute()
+
+    def delete_page_hashes(self, document_ids: Iterable[str]) -> None:
+        """
+        Deletes the stored page hashes of the given documents, so that their next
+        upload is ingested in full.
+        """
+
+        keys = [f"pages:{document_id}" for document_id in document_ids]
+
+        if not self.redis_client:
+            self.connect()
+        if self.redis_client is not None and keys:
+            self.redis_client.delete(*keys)
+
+    def set_document_version(
+        self, batch_id: str, document_id: str, version: DocumentVersion
+    ) -> None:
+        """
+        Records the page hashes and the unchanged pages of a document's new version.
+        They replace the previous version once the batch succeeds.
+        """
+
+        if not self.redis_client:
+            self.connect()
+        if self.redis_client is not None:
+            self.redis_client.hset(
+                f"batch:{batch_id}:versions", document_id, version.model_dump_json()
+            )
+
+    def get_document_versions(self, batch_id: str) -> Dict[str, DocumentVersion]:
+        """
+        Retrieves the new version of every document of the batch.
+        """
+
+        if not self.redis_client:
+            self.connect()
+        if self.redis_client is not None:
+            data = self.redis_client.hgetall(f"batch:{batch_id}:versions")
+            return {
+                document_id: DocumentVersion.model_validate_json(version)
+                for document_id, version in data.items()  # type: ignore
+            }
+
+        return {}
+
+    def clear_document_versions(self, batch_id: str) -> None:
+        """
+        Deletes the record of the batch's document versions.
+        """
+
+        if not self.redis_client:
+            self.connect()
+        if self.redis_client is not None:
+            self.redis_client.delete(f"batch:{batch_id}:versions")
+
+    def add_batch_document(self, batch_id: str, document_id: str) -> None:
+        """
+        Records that a document was ingested as part of the batch.
+        """
+
+        if not self.redis_client:
+            self.connect()
+        if self.redis_client is not None:
+            self.redis_client.sadd(f"batch:{batch_id}:documents", document_id)
+
+    def get_batch_documents(self, batch_id: str) -> Set[str]:
+        """
+        Retrieves the IDs of the documents ingested as part of the batch.
+        """
+
+        if not self.redis_client:
+            self.connect()
+        if self.redis_client is not None:
+            return self.redis_client.smembers(f"batch:{batch_id}:documents")  # type: ignore
+
+        return set()
+
+    def bump_docset_version(self, user_id: str) -> None:
+        """
+        Increments the version of the user's document set. Cached answers are
+        scoped to the version, so this invalidates them.
+        """
+
+        if not self.redis_client:
+            self.connect()
+        if self.redis_client is not None:
+            self.redis_client.incr(f"docset:{user_id}")
+
+    def bump_memory_version(self, user_id: str) -> None:
+        """
+        Increments the version of the user's mem0 memories. Cached memory
+        searches are keyed by the version, so this invalidates them.
+        """
+
+        if not self.redis_client:
+            self.connect()
+        if self.redis_client is not None:
+            self.redis_client.incr(f"memory:version:{user_id}")
+
+    async def get_memory_version_async(self, user_id: str) -> int:
+        """
+        Returns the version of the user's mem0 memories.
+        """
+
+        if not self.aioredis_client:
+            await self.connect_async()
+        if self.aioredis_client is not None:
+            return int(await self.aioredis_client.get(f"memory:version:{user_id}") or 0)
+
+        return 0
+
+    def set_active_migration(self, migration: MigrationDetails) -> None:
+        """
+        Marks a re-embedding migration as running so that new ingestions
+        are written to its shadow collection too.
+        """
+
+        if not self.redis_client:
+            self.connect()
+        if self.redis_client is not None:
+            self.redis_client.set("reembedding:active", migration.model_dump_json())
+
+    def get_active_migration(self) -> MigrationDetails | None:
+        """
+        Returns the running re-embedding migration, if any.
+        """
+
+        if not self.redis_client:
+            self.connect()
+        if self.redis_client is not None:
+            data = self.redis_client.get("reembedding:active")
+            if data:
+                return MigrationDetails.model_validate_json(data)  # type: ignore
+
+        return None
+
+    def clear_active_migration(self) -> None:
+        """
+        Clears the running re-embedding migration marker.
+        """
+
+        if not self.redis_client:
+            self.connect()
+        if self.redis_client is not None:
+            self.redis_client.delete("reembedding:active")
+
+    def set_active_embedder(self, embedder: EmbedderDetails) -> None:
+        """
+        Records the embedder of the RAG collection, once a re-embedding migration
+        has pointed the collection alias to its vectors.
+        """
+
+        if not self.redis_client:
+            self.connect()
+        if self.redis_client is not None:
+            self.redis_client.set("embedder:active", embedder.model_dump_json())
+
+    def get_active_embedder(self) -> EmbedderDetails | None:
+        """
+        Returns the embedder recorded by the last re-embedding migration, if any.
+        """
+
+        if not self.redis_client:
+            self.connect()
+        if self.redis_client is not None:
+            data = self.redis_client.get("embedder:active")
+            if data:
+                return EmbedderDetails.model_validate_json(data)  # type: ignore
+
+        return None
+
+    async def get_active_embedder_async(self) -> EmbedderDetails | None:
+        """
+        Asynchronously returns the embedder recorded by the last re-embedding migration, if any.
+        """
+
+        if not self.aioredis_client:
+            await self.connect_async()
+        if self.aioredis_client is not None:
+            data = await self.aioredis_client.get("embedder:active")
+            if data:
+                return EmbedderDetails.model_validate_json(data)
+
+        return None
+
 
 def check_ingestion_failure(batch_id: str) -> bool:
     """
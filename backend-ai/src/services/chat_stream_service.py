@@ -0,0 +1,137 @@
+import asyncio
+from typing import AsyncGenerator, AsyncIterator, Set, Tuple
+from uuid import uuid4
+from redis.asyncio import Redis
+from ..core.config import env_config
+
+# Queue item of a live response: the Redis entry ID and frame, or None at the end.
+LiveFrame = Tuple[bytes | None, bytes] | None
+
+
+class ChatStreamService:
+    """
+    Makes chat responses resumable.
+
+    The response is generated by a background task, independent of the client connection.
+    Every SSE frame is appended to a short-lived Redis stream and handed to the live
+    response along with its entry ID, which is sent as the SSE event ID. A client that
+    reconnects with Last-Event-ID is served the frames after it from Redis, while
+    generation goes on.
+    """
+
+    def __init__(self, host: str = "localhost", port: int = 6379):
+        self.client: Redis | None = None
+        self.connection_details = (host, port)
+        self.tasks: Set[asyncio.Task] = set()
+
+    async def connect(self) -> None:
+        """
+        Connects the redis chat streaming client.
+        """
+
+        if not self.client:
+            self.client = Redis(
+                host=self.connection_details[0], port=self.connection_details[1], db=2
+            )
+            print("Redis Chat Streaming Client connected.")
+
+    async def disconnect(self) -> None:
+        """
+        Disconnects the redis chat streaming client.
+        """
+
+        if self.client:
+            await self.client.close()
+            self.client = None
+            print("Redis Chat Streaming Client disconnected.")
+
+    async def append(self, key: str, fields: dict) -> bytes | None:
+        """
+        Appends an entry to the chat stream and returns its ID. If Redis fails, the
+        live response goes on without an ID, it just can't be resumed.
+        """
+
+        try:
+            if not self.client:
+                await self.connect()
+            assert self.client is not None
+
+            pipeline = self.client.pipeline()
+            pipeline.xadd(name=key, fields=fields)
+            pipeline.expire(name=key, time=env_config.CHAT_STREAM_TTL)
+            entry_id, _ = await pipeline.execute()
+            return entry_id
+        except Exception as e:
+            print(f"Error while writing to chat stream {key}: {str(e)}")
+            return None
+
+    def start(
+        self, user_id: str, frames: AsyncIterator[bytes]
+    ) -> Tuple[str, AsyncGenerator[bytes, None]]:
+        """
+        Starts generating a response in the background and returns the stream ID with
+        the live response.
+        """
+
+        stream_id = str(uuid4())
+        key = f"chat_stream:{user_id}:{stream_id}"
+        queue: asyncio.Queue[LiveFrame] = asyncio.Queue()
+
+        async def produce() -> None:
+            try:
+                async for frame in frames:
+                    queue.put_nowait((await self.append(key, {"frame": frame}), frame))
+            finally:
+                await self.append(key, {"end": 1})
+                queue.put_nowait(None)
+
+        task = asyncio.create_task(produce())
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+        async def live() -> AsyncGenerator[bytes, None]:
+            while (item := await queue.get()) is not None:
+                entry_id, frame = item
+                yield b"id: " + entry_id + b"\n" + frame if entry_id else frame
+
+        return stream_id, live()
+
+    async def exists(self, user_id: str, stream_id: str) -> bool:
+        if not self.client:
+            await self.connect()
+        assert self.client is not None
+
+        return bool(await self.client.exists(f"chat_stream:{user_id}:{stream_id}"))
+
+    async def resume(
+        self, user_id: str, stream_id: str, last_event_id: str | None
+    ) -> AsyncGenerator[bytes, None]:
+        """
+        Replays the frames of a chat stream after last_event_id and follows the stream
+        until the response is complete.
+        """
+
+        if not self.client:
+            await self.connect()
+        assert self.client is not None
+
+        key = f"chat_stream:{user_id}:{stream_id}"
+        last_id = last_event_id or "0-0"
+
+        while True:
+            result = await self.client.xread(
+                streams={key: last_id}, block=env_config.CHAT_STREAM_BLOCK_MS
+            )
+            # Nothing was written for the whole block, the producer is gone.
+            if not result:
+                return
+
+            _, entries = result[0]
+            for entry_id, fields in entries:
+                last_id = entry_id
+                if b"end" in fields:
+                    return
+                yield b"id: " + entry_id + b"\n" + fields[b"frame"]
+
+
+chat_stream_service = ChatStreamService()
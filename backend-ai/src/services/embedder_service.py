@@ -0,0 +1,75 @@
+import time
+from typing import List
+from ..core.config import env_config
+from ..core.embedder import Embedder, get_embedder, load_embedder
+from ..models.ingestion import EmbedderDetails
+from .batch_tracking_service import batch_tracking_service
+
+
+class EmbedderService:
+    """
+    Resolves the embedder of the RAG collection.
+
+    A re-embedding migration records its embedder in Redis when it flips the collection
+    alias, so every process switches models along with the alias, without a restart or
+    configuration change. Until then, the RAG collection uses the configured embedder.
+
+    Queries are embedded on every chat request, so the API caches the recorded embedder
+    for `EMBEDDER_ACTIVE_TTL` seconds instead of reading Redis each time.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self.active: EmbedderDetails | None = None
+        self.expires_at = 0.0
+
+    def get_rag_embedder(self) -> Embedder:
+        """
+        Returns the embedder of the RAG collection. This is not cached, since the embedding
+        worker must not write vectors of the previous model once the alias has flipped.
+        """
+
+        active = batch_tracking_service.get_active_embedder()
+        if active is None:
+            return get_embedder()
+
+        return load_embedder(active.backend, active.model, active.dims)
+
+    async def get_rag_embedder_async(self) -> Embedder:
+        """
+        Asynchronously returns the embedder of the RAG collection, cached for `ttl` seconds.
+        """
+
+        if time.monotonic() >= self.expires_at:
+            self.active = await batch_tracking_service.get_active_embedder_async()
+            self.expires_at = time.monotonic() + self.ttl
+
+        active = self.active
+        if active is None:
+            return get_embedder()
+
+        return load_embedder(active.backend, active.model, active.dims)
+
+    async def embed_query(self, user_query: str) -> List[float]:
+        """
+        Embeds the user query with the embedder of the RAG collection without
+        blocking the main FastAPI event loop.
+        """
+
+        return await (await self.get_rag_embedder_async()).aembed_query(user_query)
+
+    async def embed_memory_query(
+        self, user_query: str, query_embedding: List[float]
+    ) -> List[float]:
+        """
+        Returns the embedding of the user query for mem0 searches. The memory store always
+        uses the configured embedder, so the RAG query embedding is only reused until a
+        re-embedding migration moves the RAG collection to another model.
+        """
+
+        if await self.get_rag_embedder_async() is get_embedder():
+            return query_embedding
+        return await get_embedder().aembed_query(user_query)
+
+
+embedder_service = EmbedderService(ttl=env_config.EMBEDDER_ACTIVE_TTL)
@@ -1,17 +1,44 @@
 import asyncio
-from qdrant_client.models import Filter, FieldCondition, MatchValue
-from typing import AsyncGenerator, Literal
-from langchain_qdrant import QdrantVectorStore
+import re
+import time
+from typing import Any, AsyncGenerator, Awaitable, Dict, List, Literal, Set, TypeVar
 from langgraph.graph import StateGraph, START, END
-from langgraph.checkpoint.memory import InMemorySaver
-from langchain_ollama import OllamaEmbeddings
 from langchain_core.runnables import RunnableConfig
 from langgraph.config import get_stream_writer
-from ..core.utils import get_query_embeddings
+from ..core.context import assemble_context, estimate_tokens
+from ..core.history import (
+    context_digest,
+    count_turns,
+    format_transcript,
+    split_history,
+    trim_marker,
+)
 from ..core.config import env_config
-from ..models.chat import State
+from ..models.chat import ChatEvent, Prefetch, RetrievedChunk, State
 from ..core.llm_client import llm_service
+from ..db.checkpointer import checkpoint_saver
 from ..db.mem0 import mem0_client
+from .answer_cache_service import answer_cache_service
+from .batch_tracking_service import batch_tracking_service
+from .embedder_service import embedder_service
+from .memory_cache_service import memory_cache_service
+from .retrieval_service import retrieval_service
+from .router_service import QueryType, query_router
+
+
+T = TypeVar("T")
+
+Stage = Literal["classification", "retrieval", "memory"]
+
+STAGE_TIMEOUTS: Dict[Stage, float] = {
+    "classification": env_config.CHAT_CLASSIFICATION_TIMEOUT,
+    "retrieval": env_config.CHAT_RETRIEVAL_TIMEOUT,
+    "memory": env_config.CHAT_MEMORY_TIMEOUT,
+}
+
+# Users whose history is being compacted, and the running compaction tasks.
+compacting_users: Set[str] = set()
+compaction_tasks: Set[asyncio.Task] = set()
 
 
 BASE_PROMPT_TEXT = """
@@ -34,13 +61,41 @@ you could start with "Oh!" or "Wow".
 
 
 async def stream_llm_response(
-    user_id: str, user_query: str, is_voice: bool
-) -> AsyncGenerator[str, None]:
+    user_id: str,
+    user_query: str,
+    is_voice: bool,
+    batch_ids: List[str] | None = None,
+    document_ids: List[str] | None = None,
+) -> AsyncGenerator[ChatEvent, None]:
     """
-    Invokes the langgraph workflow and streams the response as SSE.
+    Invokes the langgraph workflow and streams the response as chat events: 'text'
+    events with the response deltas, and a 'skipped' event for every stage that
+    overran its deadline. Retrieval is limited to the given batches and/or documents, if any.
     """
 
-    config: RunnableConfig = {"configurable": {"thread_id": user_id}}
+    batch_ids = batch_ids or []
+    document_ids = document_ids or []
+
+    # Retrieval runs speculatively while the query is classified.
+    prefetch = (
+        start_prefetch(
+            user_id=user_id,
+            user_query=user_query,
+            batch_ids=batch_ids,
+            document_ids=document_ids,
+        )
+        if env_config.CHAT_SPECULATIVE_RETRIEVAL
+        else None
+    )
+
+    # Deadline for the stages before generation, so time-to-first-token stays bounded.
+    config: RunnableConfig = {
+        "configurable": {
+            "thread_id": user_id,
+            "prefetch": prefetch,
+            "deadline": time.monotonic() + env_config.CHAT_DEADLINE,
+        }
+    }
     initial_state = State(
         {
             "user_id": user_id,
@@ -48,19 +103,395 @@ async def stream_llm_response(
             "messages": [],
             "query_type": None,
             "is_voice": is_voice,
+            "batch_ids": batch_ids,
+            "document_ids": document_ids,
         }
     )
 
-    async for chunk in graph.astream(
-        initial_state, config=config, stream_mode="custom"
-    ):
-        delta = chunk.get("delta")
-        if delta:
-            yield delta
-            await asyncio.sleep(0.01)
+    try:
+        # Document-grounded text answers are served from the semantic cache when a
+        # similar query was answered over the same document set, after the same turn.
+        cache_scope, query_embedding, cache_context = None, None, ""
+        if env_config.ANSWER_CACHE_ENABLED and not is_voice:
+            try:
+                query_embedding = await get_query_embedding(initial_state, config)
+                cache_scope = await answer_cache_service.get_scope(
+                    user_id, batch_ids=batch_ids, document_ids=document_ids
+                )
+                snapshot = await graph.aget_state(config)
+                cache_context = context_digest(snapshot.values.get("messages", []))
+                cached_answer = await answer_cache_service.lookup(
+                    cache_scope, query_embedding, cache_context
+                )
+            except Exception as e:
+                print(f"Error during answer cache lookup: {str(e)}")
+                cache_scope, cached_answer = None, None
+
+            if cached_answer is not None:
+                await record_cached_turn(config, user_query, cached_answer)
+                schedule_history_compaction(user_id)
+                for delta in split_answer(cached_answer):
+                    yield ChatEvent(type="text", content=delta)
+                return
+
+        skipped = False
+        async for chunk in graph.astream(
+            initial_state, config=config, stream_mode="custom"
+        ):
+            if chunk.get("skipped"):
+                skipped = True
+                yield ChatEvent(type="skipped", content=chunk["skipped"])
+
+            delta = chunk.get("delta")
+            if delta:
+                yield ChatEvent(type="text", content=delta)
+
+        schedule_history_compaction(user_id)
+
+        # Answers built on partial context are not cached.
+        if cache_scope is not None and query_embedding is not None and not skipped:
+            snapshot = await graph.aget_state(config)
+            if snapshot.values.get("query_type") == "RETRIEVAL":
+                answer = snapshot.values["messages"][-1]["content"]
+                try:
+                    await answer_cache_service.store(
+                        cache_scope, query_embedding, answer, cache_context
+                    )
+                except Exception as e:
+                    print(f"Error while caching the answer: {str(e)}")
+    finally:
+        if prefetch is not None:
+            discard_prefetch(prefetch)
+
+
+async def record_cached_turn(config: RunnableConfig, user_query: str, answer: str) -> None:
+    """
+    Adds a turn answered from the cache to the conversation history, as if the
+    retrieval node had answered it.
+    """
+
+    await graph.aupdate_state(
+        config,
+        {
+            "user_query": user_query,
+            "query_type": "RETRIEVAL",
+            "messages": [
+                {"role": "user", "content": user_query},
+                {"role": "assistant", "content": answer},
+            ],
+        },
+        as_node="retrieval_query",
+    )
+
+
+def schedule_history_compaction(user_id: str) -> None:
+    """
+    Compacts the user's conversation history in the background, unless it is
+    already being compacted.
+    """
+
+    if user_id in compacting_users:
+        return
+
+    compacting_users.add(user_id)
+    task = asyncio.create_task(compact_history(user_id))
+    compaction_tasks.add(task)
+
+    def on_done(task: asyncio.Task) -> None:
+        compacting_users.discard(user_id)
+        compaction_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Error while compacting the history of user {user_id}: {str(task.exception())}")
+
+    task.add_done_callback(on_done)
+
+
+async def compact_history(user_id: str) -> None:
+    """
+    Folds the turns before the last HISTORY_KEEP_TURNS into the running summary and
+    drops them from the messages, once HISTORY_COMPACT_TURNS of them have piled up.
+    This bounds the history each turn sends to the model.
+
+    If a turn of the user checkpoints over this update, the summary is lost but so
+    is the trim, and the next compaction redoes both.
+    """
+
+    config: RunnableConfig = {"configurable": {"thread_id": user_id}}
+    snapshot = await graph.aget_state(config)
+
+    older, _ = split_history(
+        snapshot.values.get("messages", []), keep_turns=env_config.HISTORY_KEEP_TURNS
+    )
+    if count_turns(older) < env_config.HISTORY_COMPACT_TURNS:
+        return
+
+    summary = await summarize_history(snapshot.values.get("summary", ""), older)
+    # Recorded as an update of an answering node, so no node is left to run.
+    await graph.aupdate_state(
+        config,
+        {"summary": summary, "messages": [trim_marker(older)]},
+        as_node="normal_query",
+    )
+    print(f"Compacted {count_turns(older)} turns of user {user_id} into the history summary.")
+
+
+async def summarize_history(summary: str, messages: List[Dict[str, Any]]) -> str:
+    """
+    Makes an LLM call to fold older conversation turns into the running summary.
+    """
+
+    SYSTEM_PROMPT = """
+    You maintain a running summary of a conversation between a user and an AI Assistant.
+    You will receive the current summary and the turns that followed it. Return the
+    updated summary, in at most 200 words.
+
+    Keep the facts, names, numbers, decisions and open questions the assistant may need
+    later, and what the user asked about. Leave out greetings and filler.
+    Return only the summary.
+    """
+
+    async with llm_service.get_client() as llm_client:
+        response = await llm_client.responses.create(
+            model=env_config.GROQ_MODEL,
+            instructions=SYSTEM_PROMPT,
+            input=[
+                {
+                    "role": "user",
+                    "content": f"Current summary:\n{summary or '(none)'}\n\n"
+                    f"Turns that followed:\n{format_transcript(messages)}",
+                }
+            ],
+            max_output_tokens=env_config.HISTORY_SUMMARY_MAX_TOKENS,
+        )
+
+    return response.output_text.strip()
+
+
+def get_history_prompt(state: State) -> str:
+    """
+    Returns the summary of the earlier conversation for the system prompt.
+    """
+
+    summary = state.get("summary")
+    if not summary:
+        return ""
+
+    return f"Summary of the earlier conversation, before the messages you receive:\n{summary}"
+
+
+def split_answer(answer: str) -> List[str]:
+    """
+    Splits a cached answer into word groups, so that it is replayed like a streamed response.
+    """
+
+    words = re.findall(r"\S+\s*", answer)
+    return ["".join(words[i : i + 8]) for i in range(0, len(words), 8)]
+
+
+def start_prefetch(
+    user_id: str, user_query: str, batch_ids: List[str], document_ids: List[str]
+) -> Prefetch:
+    """
+    Starts the query embedding, vector search and mem0 search as background tasks,
+    so that they run concurrently with the query classification. The tasks are shared,
+    so they are awaited through asyncio.shield: cancelling one of their awaiters, like
+    a search or a stage past its deadline, doesn't cancel them for the others.
+    """
+
+    query_embedding = asyncio.create_task(embedder_service.embed_query(user_query))
+
+    async def search() -> List[RetrievedChunk]:
+        return await retrieval_service.search(
+            user_id=user_id,
+            query_embedding=await asyncio.shield(query_embedding),
+            user_query=user_query,
+            batch_ids=batch_ids,
+            document_ids=document_ids,
+        )
+
+    async def search_memories() -> Dict[str, Any]:
+        memory_embedding = await embedder_service.embed_memory_query(
+            user_query, await asyncio.shield(query_embedding)
+        )
+        if env_config.MEMORY_CACHE_ENABLED:
+            return await memory_cache_service.search(
+                user_id=user_id, user_query=user_query, query_embedding=memory_embedding
+            )
+        return await mem0_client.search_memories(
+            user_query=user_query,
+            user_id=user_id,
+            query_embedding=memory_embedding,
+            memory_version=await batch_tracking_service.get_memory_version_async(user_id),
+        )
+
+    return Prefetch(
+        query_embedding=query_embedding,
+        documents=asyncio.create_task(search()),
+        memories=asyncio.create_task(search_memories()),
+    )
+
+
+def discard_prefetch(prefetch: Prefetch) -> None:
+    """
+    Cancels the prefetch tasks that are still running once the workflow is over.
+    """
+
+    for task in (prefetch.query_embedding, prefetch.documents, prefetch.memories):
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled():
+            # Marks a failure of an unused task as retrieved.
+            task.exception()
+
+
+async def run_stage(
+    stage: Stage, awaitable: Awaitable[T], fallback: T, config: RunnableConfig
+) -> T:
+    """
+    Awaits a pipeline stage within its deadline, which is the stage's own budget capped
+    by what is left of the overall chat budget. If the stage overruns, it is cancelled,
+    a 'skipped' event is emitted and the answer proceeds with the fallback. A stage that
+    fails, or whose prefetch task was cancelled, is skipped the same way.
+    """
+
+    timeout = STAGE_TIMEOUTS[stage]
+    deadline: float | None = config["configurable"].get("deadline")
+    if deadline is not None:
+        timeout = min(timeout, max(deadline - time.monotonic(), 0.0))
+
+    try:
+        return await asyncio.wait_for(awaitable, timeout=timeout)
+    except asyncio.TimeoutError:
+        reason = f"exceeded its {timeout:.2f}s deadline"
+    except asyncio.CancelledError:
+        # Only the cancellation of a prefetch task is a skipped stage, not the turn's own.
+        current_task = asyncio.current_task()
+        if current_task is not None and current_task.cancelling():
+            raise
+        reason = "lost its prefetch task"
+    except Exception as e:
+        reason = f"failed ({str(e)})"
+
+    print(f"Chat stage '{stage}' {reason} and was skipped.")
+    get_stream_writer()({"skipped": stage})
+    return fallback
+
+
+async def get_query_embedding(state: State, config: RunnableConfig) -> List[float]:
+    """
+    Returns the embedding of the user query, from the prefetch if one was started.
+    """
+
+    prefetch: Prefetch | None = config["configurable"].get("prefetch")
+    if prefetch is not None:
+        return await asyncio.shield(prefetch.query_embedding)
+
+    return await embedder_service.embed_query(state.get("user_query"))
+
+
+async def search_documents(state: State, config: RunnableConfig) -> List[RetrievedChunk]:
+    """
+    Returns the chunks of the user's documents relevant to the query, from the
+    prefetch if one was started.
+    """
+
+    prefetch: Prefetch | None = config["configurable"].get("prefetch")
+    if prefetch is not None:
+        return await asyncio.shield(prefetch.documents)
+
+    query_embedding = await get_query_embedding(state, config)
+    return await retrieval_service.search(
+        user_id=state.get("user_id"),
+        query_embedding=query_embedding,
+        user_query=state.get("user_query"),
+        batch_ids=state.get("batch_ids"),
+        document_ids=state.get("document_ids"),
+    )
+
+
+async def search_user_context(state: State, config: RunnableConfig) -> str:
+    """
+    Returns the mem0 memories about the user relevant to the query, from the
+    prefetch if one was started.
+    """
+
+    prefetch: Prefetch | None = config["configurable"].get("prefetch")
+    if prefetch is not None:
+        mem_search = await asyncio.shield(prefetch.memories)
+    else:
+        memory_embedding = await embedder_service.embed_memory_query(
+            state.get("user_query"), await get_query_embedding(state, config)
+        )
+        if env_config.MEMORY_CACHE_ENABLED:
+            mem_search = await memory_cache_service.search(
+                user_id=state.get("user_id"),
+                user_query=state.get("user_query"),
+                query_embedding=memory_embedding,
+            )
+        else:
+            mem_search = await mem0_client.search_memories(
+                user_query=state.get("user_query"),
+                user_id=state.get("user_id"),
+                query_embedding=memory_embedding,
+                memory_version=await batch_tracking_service.get_memory_version_async(
+                    state.get("user_id")
+                ),
+            )
+
+    memories = "\n".join(f"- {entry.get('memory')}" for entry in mem_search.get("results", []))
+    relations = "\n".join(
+        f"- {entry.get('source')} {entry.get('relationship')} {entry.get('destination')}"
+        for entry in mem_search.get("relations", [])
+    )
+    print(
+        f"User context: {estimate_tokens(memories)} tokens from the vector tier, "
+        f"{estimate_tokens(relations)} tokens from the graph tier."
+    )
+
+    if not relations:
+        return memories
+    return f"{memories}\n\nRelations between the things the user mentioned:\n{relations}"
 
 
-async def classify_query(state: State) -> State:
+async def classify_query(state: State, config: RunnableConfig) -> State:
+    """
+    Classifies the query as 'NORMAL' | 'RETRIEVAL'.
+
+    Unless ROUTER_MODE is 'llm', users without ingested documents always get 'NORMAL',
+    and other queries are routed locally by their embedding. The LLM is only called
+    when the local router isn't confident enough in 'hybrid' mode.
+    """
+
+    # Add user query to messages.
+    state["messages"] = [{"role": "user", "content": state.get("user_query")}]
+
+    async def classify() -> QueryType:
+        if env_config.ROUTER_MODE != "llm":
+            query_embedding, has_documents = await asyncio.gather(
+                get_query_embedding(state, config),
+                retrieval_service.has_documents(state.get("user_id")),
+            )
+
+            if not has_documents:
+                return "NORMAL"
+
+            query_type, confidence = await query_router.route(query_embedding)
+            if (
+                env_config.ROUTER_MODE == "local"
+                or confidence >= env_config.ROUTER_CONFIDENCE_THRESHOLD
+            ):
+                return query_type
+
+            print(f"Query router confidence {confidence:.3f} too low. Falling back to LLM.")
+
+        return await classify_query_with_llm(state.get("user_query"))
+
+    # Queries that can't be classified in time are answered as 'NORMAL'.
+    state["query_type"] = await run_stage("classification", classify(), "NORMAL", config)
+    return state
+
+
+async def classify_query_with_llm(user_query: str) -> QueryType:
     """
     Makes an LLM call to classify the query as 'NORMAL' | 'RETRIEVAL'.
     """
@@ -77,27 +508,20 @@ async def classify_query(state: State) -> State:
     In case you are unable to make out the type of query, return 'NORMAL'.
     """
 
-    # Add user query to messages.
-    state["messages"] = [{"role": "user", "content": state.get("user_query")}]
-
     # Make LLM call.
     async with llm_service.get_client() as llm_client:
         response = await llm_client.responses.create(
             model=env_config.GROQ_MODEL,
             instructions=SYSTEM_PROMPT,
-            input=state.get("messages"),
+            input=[{"role": "user", "content": user_query}],
             max_output_tokens=100,
         )
 
-    # Update state with query type.
     output_text = response.output_text.strip().upper()
-    if output_text not in ["NORMAL", "RETRIEVAL"]:
-        output_text = "NORMAL"
-
-    assert output_text == "NORMAL" or output_text == "RETRIEVAL"
+    if output_text == "RETRIEVAL":
+        return "RETRIEVAL"
 
-    state["query_type"] = output_text
-    return state
+    return "NORMAL"
 
 
 async def route_query(state: State) -> Literal["normal_query", "retrieval_query"]:
@@ -111,19 +535,19 @@ async def route_query(state: State) -> Literal["normal_query", "retrieval_query"
     return "normal_query"
 
 
-async def normal_query(state: State) -> State:
+async def normal_query(state: State, config: RunnableConfig) -> State:
     """
     Makes a streaming LLM call to answer the user query and yeilds response
     as chunks.
     """
 
-    # Search mem0 for user context.
-    mem_search = await mem0_client.search_memories(
-        user_query=state.get("user_query"), user_id=state.get("user_id")
-    )
+    # The speculative document search is not needed for normal queries.
+    prefetch: Prefetch | None = config["configurable"].get("prefetch")
+    if prefetch is not None:
+        prefetch.documents.cancel()
 
-    mem_list = [entry.get("memory") for entry in mem_search.get("results", [])]
-    user_context = "\n".join(f"- {mem}" for mem in mem_list)
+    # Search mem0 for user context.
+    user_context = await run_stage("memory", search_user_context(state, config), "", config)
 
     SYSTEM_PROMPT = f"""
     {BASE_PROMPT_AUDIO if state.get("is_voice") else BASE_PROMPT_TEXT}
@@ -135,6 +559,8 @@ async def normal_query(state: State) -> State:
     You are also provided with a context about the user:
     
     {user_context}
+
+    {get_history_prompt(state)}
     """
 
     writer = get_stream_writer()
@@ -168,58 +594,36 @@ async def normal_query(state: State) -> State:
     return state
 
 
-async def retrieval_query(state: State) -> State:
+async def retrieval_query(state: State, config: RunnableConfig) -> State:
     """
     Converts user query into vector embeddings and performs a vector similarity
     search to retrieve relevant data from vector database to answer the query.
     The retrieved data is then sent to the LLM to generate a response.
     """
 
-    embeddings = OllamaEmbeddings(
-        model=env_config.EMBEDDER_MODEL,
-        base_url="http://localhost:11434",
-    )
-
-    vector_db = QdrantVectorStore.from_existing_collection(
-        url="http://localhost:6333",
-        collection_name=env_config.RAG_COLLECTION_NAME,
-        embedding=embeddings,
+    # Search the user's documents and mem0 for user context concurrently.
+    search_results, user_context = await asyncio.gather(
+        run_stage("retrieval", search_documents(state, config), [], config),
+        run_stage("memory", search_user_context(state, config), "", config),
     )
 
-    query_embedding = await get_query_embeddings(state.get("user_query"))
-
-    # Perform vector similarity search with user query and filter by user ID.
-    # This ensures that the search is only performed on the user's documents.
-    search_results = await vector_db.asimilarity_search_by_vector(
-        embedding=query_embedding,
-        filter=Filter(
-            must=[
-                FieldCondition(
-                    key="metadata.user_id", match=MatchValue(value=state.get("user_id"))
-                )
-            ]
+    # Merge overlapping hits and pack them into the context token budget.
+    context = assemble_context(
+        search_results,
+        token_budget=env_config.CONTEXT_TOKEN_BUDGET,
+        min_relative_score=(
+            env_config.CONTEXT_MIN_RELATIVE_FUSED_SCORE
+            if any(chunk.fused for chunk in search_results)
+            else env_config.CONTEXT_MIN_RELATIVE_SCORE
         ),
     )
 
-    # Format search results into context.
-    context = [
-        f"Page Content: {result.page_content}\nPage Label: {result.metadata.get('page_label')}"
-        for result in search_results
-    ]
-
-    # Search mem0 for user context.
-    mem_search = await mem0_client.search_memories(
-        user_query=state.get("user_query"), user_id=state.get("user_id")
-    )
-
-    mem_list = [entry.get("memory") for entry in mem_search.get("results", [])]
-    user_context = "\n".join(f"- {mem}" for mem in mem_list)
-
     SYSTEM_PROMPT = f"""
     {BASE_PROMPT_AUDIO if state.get("is_voice") else BASE_PROMPT_TEXT}
 
     You have to answer the query based on the document context provided.
 
+    The document context consists of numbered passages, each headed by its file name and page.
     If applicable and available, also provide the page number where the answer is found.
     If context not available, try to answer the query based on your general knowledge, else return a helpful message.
 
@@ -228,6 +632,8 @@ async def retrieval_query(state: State) -> State:
 
     Document Context:
     {context}
+
+    {get_history_prompt(state)}
     """
 
     writer = get_stream_writer()
@@ -264,6 +670,5 @@ workflow.add_conditional_edges("classify_query", route_query)
 workflow.add_edge("normal_query", END)
 workflow.add_edge("retrieval_query", END)
 
-# Setup in-memory checkpoint
-checkpointer = InMemorySaver()
-graph = workflow.compile(checkpointer=checkpointer)
+# Conversation state is checkpointed in Redis.
+graph = workflow.compile(checkpointer=checkpoint_saver)
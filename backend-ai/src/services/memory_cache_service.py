@@ -0,0 +1,88 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+import numpy as np
+from ..core.config import env_config
+from ..db.mem0 import mem0_client
+from .batch_tracking_service import batch_tracking_service
+
+CacheKey = Tuple[str, int, int]
+
+
+class MemoryCacheService:
+    """
+    In-process LRU cache of mem0 search results.
+
+    Entries are keyed by the user, the version of the user's memories and a SimHash
+    bucket of the query embedding, so repeated and near-identical queries skip mem0.
+    A bucket can hold dissimilar queries, so an entry is only used if the cosine
+    similarity of its query to the new one reaches the threshold.
+    The memory worker bumps the version in Redis after writing new memories, which
+    makes the user's earlier entries unreachable; they then age out of the LRU.
+    """
+
+    def __init__(self, capacity: int, hash_bits: int, threshold: float) -> None:
+        self.capacity = capacity
+        self.hash_bits = hash_bits
+        self.threshold = threshold
+        self.entries: OrderedDict[CacheKey, Tuple[np.ndarray, Dict[str, Any]]] = OrderedDict()
+        self.planes: np.ndarray | None = None
+        self.hits = 0
+        self.misses = 0
+
+    def bucket(self, query_embedding: List[float]) -> int:
+        """
+        Returns the SimHash of the query embedding: one bit per random hyperplane,
+        set if the embedding lies on its positive side.
+        """
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        if self.planes is None or self.planes.shape[1] != query.shape[0]:
+            # A fixed seed keeps the buckets stable across restarts and processes.
+            self.planes = np.random.default_rng(0).standard_normal(
+                (self.hash_bits, query.shape[0]), dtype=np.float32
+            )
+
+        bits = ((self.planes @ query) > 0).astype(np.int64)
+        return int(bits @ (1 << np.arange(self.hash_bits, dtype=np.int64)))
+
+    async def search(
+        self, user_id: str, user_query: str, query_embedding: List[float]
+    ) -> Dict[str, Any]:
+        """
+        Returns the mem0 search results for the query, from the cache if possible.
+        """
+
+        version = await batch_tracking_service.get_memory_version_async(user_id)
+        key = (user_id, version, self.bucket(query_embedding))
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) + 1e-12
+
+        if key in self.entries:
+            cached_query, cached_result = self.entries[key]
+            if float(cached_query @ query) >= self.threshold:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                print(f"Memory cache hit. Hits: {self.hits}, misses: {self.misses}.")
+                return cached_result
+
+        self.misses += 1
+        result = await mem0_client.search_memories(
+            user_query=user_query,
+            user_id=user_id,
+            query_embedding=query_embedding,
+            memory_version=version,
+        )
+
+        self.entries[key] = (query, result)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+        return result
+
+
+memory_cache_service = MemoryCacheService(
+    capacity=env_config.MEMORY_CACHE_CAPACITY,
+    hash_bits=env_config.MEMORY_CACHE_HASH_BITS,
+    threshold=env_config.MEMORY_CACHE_THRESHOLD,
+)
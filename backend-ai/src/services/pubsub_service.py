@@ -1,16 +1,44 @@
 import asyncio
 import redis
 import redis.asyncio as aioredis
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Dict, Set, Tuple
+from uuid import uuid4
+from ..core.config import env_config
 from ..models.ingestion import ProgressState
 
+# A status update: its stream entry ID and the JSON progress state.
+StatusEntry = Tuple[str, str]
+
+
+def parse_entry_id(entry_id: str) -> Tuple[int, int]:
+    milliseconds, sequence = entry_id.split("-")
+    return int(milliseconds), int(sequence)
+
 
 class PubSubService:
+    """
+    Publishes ingestion status updates and fans them out to the status streams.
+
+    Every update is appended to a capped Redis stream per batch ('status:{batch_id}'),
+    so listeners read from a cursor and late or reconnecting clients catch up on the
+    transitions they missed. Every API process reads all streams its listeners watch
+    with one blocking XREAD, and dispatches the entries to the queues of the listeners.
+    """
+
     def __init__(self, host: str = "localhost", port: int = 6379) -> None:
         self.publisher: None | redis.Redis = None
         self.async_publisher: None | aioredis.Redis = None
         self.async_subscriber: None | aioredis.Redis = None
         self.connection_details = (host, port)
+        self.reader: asyncio.Task | None = None
+        self.listeners: Dict[str, Set[asyncio.Queue[StatusEntry]]] = {}
+        # Last entry read by the reader from each watched stream.
+        self.cursors: Dict[str, str] = {}
+        # Appending to this stream interrupts the reader's XREAD when a stream is added.
+        # It is read from a cursor too, so a wake-up sent between two reads isn't missed.
+        self.wakeup_key = f"status_wakeup:{uuid4()}"
+        self.wakeup_cursor = "0-0"
+        self.lock = asyncio.Lock()
 
     def connect(self) -> None:
         """
@@ -65,6 +93,9 @@ class PubSubService:
         Disconnect the redis clients for publisher and subscriber.
         """
 
+        if self.reader:
+            self.reader.cancel()
+            self.reader = None
         if self.async_publisher:
             await self.async_publisher.close()
             self.async_publisher = None
@@ -77,45 +108,157 @@ class PubSubService:
     def publish(self, channel: str, data: ProgressState) -> None:
         """
         This method is synchronous.
-        Publishes a JSON message to a specified channel.
+        Appends a JSON message to the stream of a specified channel.
         """
 
         if not self.publisher:
             self.connect()
         if self.publisher is not None:
-            self.publisher.publish(channel, data.model_dump_json())
+            pipeline = self.publisher.pipeline()
+            pipeline.xadd(
+                channel,
+                {"data": data.model_dump_json()},
+                maxlen=env_config.STATUS_STREAM_MAXLEN,
+                approximate=False,
+            )
+            pipeline.expire(channel, env_config.STATUS_STREAM_TTL)
+            pipeline.execute()
 
     async def publish_async(self, channel: str, data: ProgressState) -> None:
         """
-        Publishes a JSON message to a specified channel.
+        Appends a JSON message to the stream of a specified channel.
         """
 
         if not self.async_publisher:
             await self.connect_async()
         if self.async_publisher is not None:
-            await self.async_publisher.publish(channel, data.model_dump_json())
+            pipeline = self.async_publisher.pipeline()
+            pipeline.xadd(
+                channel,
+                {"data": data.model_dump_json()},
+                maxlen=env_config.STATUS_STREAM_MAXLEN,
+                approximate=False,
+            )
+            pipeline.expire(channel, env_config.STATUS_STREAM_TTL)
+            await pipeline.execute()
 
-    async def subscribe(self, channel: str) -> AsyncGenerator[str, None]:
+    async def has_stream(self, channel: str) -> bool:
         """
-        Subscribes to a specified channel and yields messages as they arrive.
+        Checks whether any status update was published to the channel.
         """
 
-        if not self.async_subscriber:
+        if not self.async_publisher:
             await self.connect_async()
-        if self.async_subscriber is not None:
-            pubsub = self.async_subscriber.pubsub()
-            await pubsub.subscribe(channel)
+        assert self.async_publisher is not None
+
+        return bool(await self.async_publisher.exists(channel))
+
+    async def start_reader(self) -> None:
+        """
+        Starts the task that reads the watched streams, unless it is running.
+        """
+
+        async with self.lock:
+            if self.reader and not self.reader.done():
+                return
+
+            if not self.async_subscriber:
+                await self.connect_async()
+            self.reader = asyncio.create_task(self.read())
+
+    async def wake_reader(self) -> None:
+        """
+        Makes the reader restart its XREAD, so that it includes newly watched streams.
+        """
+
+        if not self.async_publisher:
+            await self.connect_async()
+        assert self.async_publisher is not None
+
+        pipeline = self.async_publisher.pipeline()
+        pipeline.xadd(self.wakeup_key, {"wakeup": 1}, maxlen=1, approximate=False)
+        pipeline.expire(self.wakeup_key, 60)
+        await pipeline.execute()
+
+    async def read(self) -> None:
+        """
+        Reads the watched streams from their cursors and dispatches every entry to the
+        listeners of its stream.
+        """
+
+        while True:
+            try:
+                assert self.async_subscriber is not None
+                result = await self.async_subscriber.xread(
+                    streams={self.wakeup_key: self.wakeup_cursor, **self.cursors},
+                    block=env_config.STATUS_STREAM_BLOCK_MS,
+                )
+
+                for channel, entries in result or []:
+                    if channel == self.wakeup_key:
+                        self.wakeup_cursor = entries[-1][0]
+                        continue
+                    # Streams left by their last listener during the read are skipped.
+                    if channel not in self.cursors:
+                        continue
+
+                    self.cursors[channel] = entries[-1][0]
+                    for entry_id, fields in entries:
+                        for queue in self.listeners.get(channel, ()):
+                            queue.put_nowait((entry_id, fields["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Redis status stream reader failed, retrying: {str(e)}")
+                await asyncio.sleep(1)
+
+    async def subscribe(
+        self, channel: str, last_id: str = "0-0"
+    ) -> AsyncGenerator[StatusEntry, None]:
+        """
+        Yields the entries of a status stream after last_id, then the new ones as they
+        arrive. The stream is no longer read once its last listener leaves.
+        """
+
+        await self.start_reader()
+
+        queue: asyncio.Queue[StatusEntry] = asyncio.Queue()
+        self.listeners.setdefault(channel, set()).add(queue)
+        cursor = parse_entry_id(last_id)
+
+        try:
+            if channel not in self.cursors:
+                # The reader takes up the new stream from the listener's cursor.
+                self.cursors[channel] = last_id
+                await self.wake_reader()
+            elif self.async_publisher is not None:
+                # Catch up on the entries the reader passed before this listener joined.
+                for entry_id, fields in await self.async_publisher.xrange(
+                    channel, min=f"({last_id}", max="+"
+                ):
+                    cursor = parse_entry_id(entry_id)
+                    yield entry_id, fields["data"]
 
             while True:
-                message = await pubsub.get_message(ignore_subscribe_messages=True)
-                if message:
-                    yield message["data"]
-                    await asyncio.sleep(0.01)
+                entry_id, data = await queue.get()
+                # The catch-up read and the reader may both deliver an entry.
+                if parse_entry_id(entry_id) <= cursor:
+                    continue
+
+                cursor = parse_entry_id(entry_id)
+                yield entry_id, data
+        finally:
+            listeners = self.listeners.get(channel)
+            if listeners is not None:
+                listeners.discard(queue)
+                if not listeners:
+                    del self.listeners[channel]
+                    self.cursors.pop(channel, None)
 
 
 def publish_ingestion_failure(user_id: str, batch_id: str) -> None:
     """
-    Publishes a failure event message to the 'status:{batch_id}' channel
+    Publishes a failure event message to the 'status:{batch_id}' stream
     in case of an errors encountered during ingestion workflow.
     This method is synchronous.
 
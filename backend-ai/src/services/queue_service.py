@@ -1,7 +1,18 @@
+import orjson
+from datetime import timedelta
 from redis import Redis
 from rq import Queue, Retry
-from typing import List
-from ..models.ingestion import ChunkingJob, CleanupJob, EmbeddingJob
+from typing import List, Literal
+from openai.types.responses import ResponseInputParam
+from ..core.config import env_config
+from ..models.chat import MemoryJob
+from ..models.ingestion import (
+    ChunkingJob,
+    CleanupJob,
+    DeletionJob,
+    EmbeddingJob,
+    ReembeddingJob,
+)
 
 
 class QueueService:
@@ -11,6 +22,8 @@ class QueueService:
         self.chunking_queue: Queue | None = None
         self.embedding_queue: Queue | None = None
         self.cleanup_queue: Queue | None = None
+        self.reembedding_queue: Queue | None = None
+        self.memory_queue: Queue | None = None
 
     def connect(self) -> None:
         """
@@ -35,6 +48,14 @@ class QueueService:
                 self.cleanup_queue = Queue(
                     name="cleanup_queue", connection=self.queue_client
                 )
+            if not self.reembedding_queue:
+                self.reembedding_queue = Queue(
+                    name="reembedding_queue", connection=self.queue_client
+                )
+            if not self.memory_queue:
+                self.memory_queue = Queue(
+                    name="memory_queue", connection=self.queue_client
+                )
         print("Redis Queue client connected.")
 
     def disconnect(self) -> None:
@@ -48,6 +69,8 @@ class QueueService:
             self.chunking_queue = None
             self.embedding_queue = None
             self.cleanup_queue = None
+            self.reembedding_queue = None
+            self.memory_queue = None
 
         print("Redis Queue client disconnected.")
 
@@ -109,4 +132,112 @@ class QueueService:
                 retry=Retry(max=3, interval=[10, 30, 60])
             )
 
+    def enqueue_deletion_job(
+        self,
+        *,
+        user_id: str,
+        batch_id: str,
+        field: Literal["batch_id", "document_id"],
+        value: str,
+    ) -> None:
+        """
+        Enqueues a job to the cleaning queue that deletes a user's vectors by batch or document.
+        This method accepts the following parameters:
+
+        - user_id: ID of the user.
+        - batch_id: ID of the batch used to track the deletion progress.
+        - field: Metadata field to delete by.
+        - value: Batch ID or document ID to delete.
+        """
+
+        if not self.cleanup_queue:
+            self.connect()
+        if self.cleanup_queue is not None:
+            self.cleanup_queue.enqueue(
+                "src.workers.cleanup_worker.purge_vectors",
+                DeletionJob(user_id=user_id, batch_id=batch_id, field=field, value=value),
+                retry=Retry(max=3, interval=[10, 30, 60])
+            )
+
+    def enqueue_reembedding_job(
+        self, *, batch_id: str, backend: str, model: str, dims: int, target_collection: str
+    ) -> None:
+        """
+        Enqueues a job that re-embeds the whole RAG collection into a shadow collection.
+        This method accepts the following parameters:
+
+        - batch_id: ID of the batch used to track the migration progress.
+        - backend: Embedder backend for the new vectors.
+        - model: Embedder model for the new vectors.
+        - dims: Dimensions of the new vectors.
+        - target_collection: Name of the shadow collection.
+        """
+
+        if not self.reembedding_queue:
+            self.connect()
+        if self.reembedding_queue is not None:
+            # Migrations run for as long as the collection takes, so no job timeout applies.
+            self.reembedding_queue.enqueue(
+                "src.workers.reembedding_worker.reembed_collection",
+                ReembeddingJob(
+                    batch_id=batch_id,
+                    backend=backend,
+                    model=model,
+                    dims=dims,
+                    target_collection=target_collection,
+                ),
+                job_timeout=-1,
+            )
+
+    def enqueue_memory_update(self, *, user_id: str, messages: ResponseInputParam) -> None:
+        """
+        Buffers a conversation turn for memory extraction. The first turn of a user
+        schedules an extraction job after MEMORY_COALESCE_DELAY seconds, and turns
+        arriving before it runs are extracted by the same job.
+        This method accepts the following parameters:
+
+        - user_id: ID of the user.
+        - messages: Messages of the conversation turn.
+        """
+
+        if not self.memory_queue:
+            self.connect()
+        if self.queue_client is not None and self.memory_queue is not None:
+            pipeline = self.queue_client.pipeline()
+            pipeline.rpush(f"memory:turns:{user_id}", orjson.dumps(messages))
+            # Turns are dropped if no extraction job takes them within a day.
+            pipeline.expire(f"memory:turns:{user_id}", 86400)
+            # Only the first turn since the last extraction schedules a job.
+            pipeline.set(
+                f"memory:pending:{user_id}",
+                1,
+                nx=True,
+                ex=env_config.MEMORY_COALESCE_DELAY + 300,
+            )
+            scheduled = pipeline.execute()[-1]
+
+            if scheduled:
+                self.schedule_memory_job(user_id=user_id, delay=env_config.MEMORY_COALESCE_DELAY)
+
+    def schedule_memory_job(self, *, user_id: str, delay: int) -> None:
+        """
+        Schedules a memory extraction job for the user's buffered turns.
+        Delayed jobs need a worker started with '--with-scheduler'.
+        This method accepts the following parameters:
+
+        - user_id: ID of the user.
+        - delay: Seconds to wait for more turns before the extraction.
+        """
+
+        if not self.memory_queue:
+            self.connect()
+        if self.memory_queue is not None:
+            self.memory_queue.enqueue_in(
+                timedelta(seconds=delay),
+                "src.workers.memory_worker.extract_memories",
+                MemoryJob(user_id=user_id),
+                retry=Retry(max=3, interval=[10, 30, 60]),
+            )
+
+
 queue_service = QueueService()
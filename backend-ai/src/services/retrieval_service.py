@@ -0,0 +1,331 @@
+import asyncio
+import time
+from typing import List, Tuple
+import numpy as np
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import (
+    Condition,
+    FieldCondition,
+    Filter,
+    MatchAny,
+    MatchValue,
+    ScoredPoint,
+    SparseVector,
+)
+from ..core.config import env_config
+from ..core.ranking import maximal_marginal_relevance, reciprocal_rank_fusion
+from ..core.sparse import encode_query
+from ..db.chunk_store import chunk_store
+from ..db.qdrant import SPARSE_VECTOR_NAME
+from ..models.chat import RetrievedChunk
+
+# Seconds for which the sparse vector check of the RAG collection is cached.
+SPARSE_CHECK_INTERVAL = 60
+
+
+class RetrievalService:
+    def __init__(self, host: str = "localhost", port: int = 6333, grpc_port: int = 6334):
+        self.client: AsyncQdrantClient | None = None
+        self.connection_details = (host, port, grpc_port)
+        self.sparse_available = False
+        self.sparse_checked_at = float("-inf")
+
+    async def connect(self) -> None:
+        """
+        Connects the async Qdrant client used for searches. With gRPC, concurrent
+        searches are multiplexed over a single long-lived HTTP/2 channel.
+        """
+
+        if not self.client:
+            self.client = AsyncQdrantClient(
+                host=self.connection_details[0],
+                port=self.connection_details[1],
+                grpc_port=self.connection_details[2],
+                prefer_grpc=env_config.QDRANT_PREFER_GRPC,
+            )
+
+        print("Qdrant retrieval client connected.")
+
+    async def disconnect(self) -> None:
+        """
+        Disconnects the async Qdrant client.
+        """
+
+        if self.client:
+            await self.client.close()
+            self.client = None
+
+        print("Qdrant retrieval client disconnected.")
+
+    async def has_documents(self, user_id: str) -> bool:
+        """
+        Checks whether the user has any ingested chunks, with a single-point scroll
+        on the indexed user ID. If the check fails, the user is assumed to have documents.
+        """
+
+        if not self.client:
+            await self.connect()
+        if self.client is None:
+            return True
+
+        try:
+            points, _ = await self.client.scroll(
+                collection_name=env_config.RAG_COLLECTION_NAME,
+                scroll_filter=Filter(
+                    must=[
+                        FieldCondition(key="metadata.user_id", match=MatchValue(value=user_id))
+                    ]
+                ),
+                limit=1,
+                with_payload=False,
+                with_vectors=False,
+            )
+        except Exception as e:
+            print(f"Error while checking the documents of user {user_id}: {str(e)}")
+            return True
+
+        return len(points) > 0
+
+    async def has_sparse_vectors(self) -> bool:
+        """
+        Checks whether the RAG collection has the BM25 sparse vector. The result is
+        cached for a minute, since the collection only changes with a migration.
+        """
+
+        if time.monotonic() - self.sparse_checked_at < SPARSE_CHECK_INTERVAL:
+            return self.sparse_available
+
+        if not self.client:
+            await self.connect()
+        if self.client is None:
+            return False
+
+        try:
+            info = await self.client.get_collection(env_config.RAG_COLLECTION_NAME)
+            self.sparse_available = SPARSE_VECTOR_NAME in (info.config.params.sparse_vectors or {})
+            if not self.sparse_available:
+                print("WARNING: The RAG collection has no BM25 sparse vectors. Retrieval is dense only.")
+        except Exception as e:
+            print(f"Error while checking the RAG collection for sparse vectors: {str(e)}")
+            self.sparse_available = False
+
+        self.sparse_checked_at = time.monotonic()
+        return self.sparse_available
+
+    async def search(
+        self,
+        user_id: str,
+        query_embedding: List[float],
+        user_query: str | None = None,
+        k: int = env_config.RETRIEVAL_TOP_K,
+        batch_ids: List[str] | None = None,
+        document_ids: List[str] | None = None,
+    ) -> List[RetrievedChunk]:
+        """
+        Searches the user's chunks and returns the top-k hits.
+
+        With RETRIEVAL_HYBRID and a query text, a BM25 search runs in parallel to the
+        vector search and both rankings are fused with Reciprocal Rank Fusion, so exact
+        identifiers and codes are found too. The chunk scores are then RRF scores. If the
+        BM25 search exceeds its latency budget or fails, the vector results are used alone.
+
+        With RETRIEVAL_MMR, RETRIEVAL_CANDIDATES hits are fetched and k of them are
+        selected with Maximal Marginal Relevance, so near-identical chunks don't crowd out the rest.
+
+        Given batch or document IDs, only chunks of those batches or documents are searched.
+        """
+
+        if not self.client:
+            await self.connect()
+        if self.client is None:
+            return []
+
+        user_filter = build_search_filter(user_id, batch_ids, document_ids)
+
+        # With MMR, fetch_k candidates are fetched along with their dense vectors.
+        mmr = env_config.RETRIEVAL_MMR
+        fetch_k = max(env_config.RETRIEVAL_CANDIDATES, k) if mmr else k
+        with_vectors: bool | List[str] = [""] if mmr else False
+
+        sparse_query = encode_query(user_query) if user_query else None
+        if (
+            not env_config.RETRIEVAL_HYBRID
+            or sparse_query is None
+            or not sparse_query.indices
+            or not await self.has_sparse_vectors()
+        ):
+            response = await self.client.query_points(
+                collection_name=env_config.RAG_COLLECTION_NAME,
+                query=query_embedding,
+                query_filter=user_filter,
+                limit=fetch_k,
+                with_payload=True,
+                with_vectors=with_vectors,
+            )
+            candidates = response.points
+            scores = [point.score for point in candidates]
+            fused = False
+        else:
+            candidates, scores = await self.hybrid_search(
+                query_embedding,
+                sparse_query,
+                user_filter,
+                limit=max(env_config.RETRIEVAL_CANDIDATES, k),
+                with_vectors=with_vectors,
+            )
+            fused = True
+
+        if mmr:
+            selected = self.diversify(candidates, scores, k)
+            candidates = [candidates[i] for i in selected]
+            scores = [scores[i] for i in selected]
+
+        chunks = await self.to_chunks(candidates[:k])
+        for chunk, score in zip(chunks, scores):
+            chunk.score = score
+            chunk.fused = fused
+
+        return chunks
+
+    async def hybrid_search(
+        self,
+        query_embedding: List[float],
+        sparse_query: SparseVector,
+        user_filter: Filter,
+        limit: int,
+        with_vectors: bool | List[str],
+    ) -> Tuple[List[ScoredPoint], List[float]]:
+        """
+        Runs the vector and BM25 searches in parallel and fuses their rankings with RRF.
+        Returns the fused candidates, best first, along with their RRF scores.
+        """
+
+        assert self.client is not None
+
+        dense = asyncio.create_task(
+            self.client.query_points(
+                collection_name=env_config.RAG_COLLECTION_NAME,
+                query=query_embedding,
+                query_filter=user_filter,
+                limit=limit,
+                with_payload=True,
+                with_vectors=with_vectors,
+            )
+        )
+        try:
+            sparse_points: List[ScoredPoint] = []
+            try:
+                sparse_response = await asyncio.wait_for(
+                    self.client.query_points(
+                        collection_name=env_config.RAG_COLLECTION_NAME,
+                        query=sparse_query,
+                        using=SPARSE_VECTOR_NAME,
+                        query_filter=user_filter,
+                        limit=limit,
+                        with_payload=True,
+                        with_vectors=with_vectors,
+                    ),
+                    timeout=env_config.RETRIEVAL_SPARSE_TIMEOUT,
+                )
+                sparse_points = sparse_response.points
+            except asyncio.TimeoutError:
+                print("BM25 search exceeded its latency budget. Using vector results only.")
+            except Exception as e:
+                print(f"Error during BM25 search: {str(e)}")
+
+            dense_points = (await dense).points
+        finally:
+            dense.cancel()
+
+        points = {str(point.id): point for point in sparse_points + dense_points}
+        fused = reciprocal_rank_fusion(
+            [
+                [str(point.id) for point in dense_points],
+                [str(point.id) for point in sparse_points],
+            ],
+            k=env_config.RETRIEVAL_RRF_K,
+        )
+
+        return [points[point_id] for point_id, _ in fused], [score for _, score in fused]
+
+    def diversify(self, candidates: List[ScoredPoint], scores: List[float], k: int) -> List[int]:
+        """
+        Selects k of the candidates with MMR on their dense vectors. The relevance is
+        the candidate's score scaled to the best one, so vector and RRF scores both work.
+        Returns the indices of the selected candidates.
+        """
+
+        vectors = [
+            point.vector.get("") if isinstance(point.vector, dict) else point.vector
+            for point in candidates
+        ]
+        if len(candidates) <= k or any(vector is None for vector in vectors):
+            return list(range(min(len(candidates), k)))
+
+        relevance = np.asarray(scores, dtype=np.float32)
+        relevance /= max(float(relevance.max()), 1e-12)
+
+        return maximal_marginal_relevance(
+            relevance,
+            np.asarray(vectors, dtype=np.float32),
+            k=k,
+            lambda_mult=env_config.RETRIEVAL_MMR_LAMBDA,
+        )
+
+    async def to_chunks(self, points: List[ScoredPoint]) -> List[RetrievedChunk]:
+        """
+        Converts search hits to chunks. In 'external' payload mode, the texts of the
+        hits are fetched from the chunk store in one batch.
+        """
+
+        chunks = [
+            RetrievedChunk(
+                id=str(point.id),
+                text=(point.payload or {}).get("page_content") or "",
+                score=point.score,
+                metadata=(point.payload or {}).get("metadata") or {},
+            )
+            for point in points
+        ]
+
+        missing = [chunk.id for chunk in chunks if not chunk.text]
+        if missing:
+            stored = await chunk_store.get_many_async(missing)
+            for chunk in chunks:
+                if chunk.id in stored:
+                    chunk.text = stored[chunk.id].page_content
+
+        return chunks
+
+
+def build_search_filter(
+    user_id: str, batch_ids: List[str] | None = None, document_ids: List[str] | None = None
+) -> Filter:
+    """
+    Builds the search filter on the indexed payload fields. The search always covers
+    only the user's chunks. If batch and document IDs are both given, chunks matching
+    either of them are searched.
+    """
+
+    # Filter by user ID so that the search only covers the user's documents.
+    must: List[Condition] = [
+        FieldCondition(key="metadata.user_id", match=MatchValue(value=user_id))
+    ]
+
+    scope: List[Condition] = []
+    if batch_ids:
+        scope.append(FieldCondition(key="metadata.batch_id", match=MatchAny(any=batch_ids)))
+    if document_ids:
+        scope.append(
+            FieldCondition(key="metadata.document_id", match=MatchAny(any=document_ids))
+        )
+
+    if len(scope) == 1:
+        must.extend(scope)
+    elif scope:
+        must.append(Filter(should=scope))
+
+    return Filter(must=must)
+
+
+retrieval_service = RetrievalService(grpc_port=env_config.QDRANT_GRPC_PORT)
@@ -0,0 +1,124 @@
+import asyncio
+from typing import Dict, List, Literal, Tuple
+import numpy as np
+from ..core.embedder import Embedder
+from .embedder_service import embedder_service
+
+QueryType = Literal["NORMAL", "RETRIEVAL"]
+
+# Labelled example queries the centroids are built from. Extend these when the
+# router benchmark shows queries it gets wrong.
+ROUTER_EXAMPLES: Dict[QueryType, List[str]] = {
+    "NORMAL": [
+        "Hi, how are you?",
+        "Hello there!",
+        "Thanks, that was helpful.",
+        "What's your name?",
+        "Tell me a joke.",
+        "Write a short poem about the sea.",
+        "Explain how a neural network works.",
+        "What is the capital of France?",
+        "How do I reverse a list in Python?",
+        "Translate 'good morning' to Spanish.",
+        "Can you help me plan a trip to Japan?",
+        "What did I tell you about my job earlier?",
+        "Remember that I prefer short answers.",
+        "Search the web for today's weather in London.",
+        "Visit https://example.com and tell me what it says.",
+        "What's the difference between TCP and UDP?",
+        "Give me a recipe for pancakes.",
+        "Who won the football world cup in 2018?",
+    ],
+    "RETRIEVAL": [
+        "Summarize the document I uploaded.",
+        "What does the PDF say about the refund policy?",
+        "According to my file, what is the project deadline?",
+        "Find the section on safety requirements in the manual.",
+        "What are the key findings in the report?",
+        "List the action items from the meeting notes I shared.",
+        "What is the total amount on the invoice?",
+        "Which page mentions the warranty terms?",
+        "What does chapter 3 of the book cover?",
+        "Quote the paragraph about data retention from my document.",
+        "Compare the two contracts I uploaded.",
+        "What are the termination clauses in the agreement?",
+        "Based on the uploaded paper, what methodology did the authors use?",
+        "Does the handbook say anything about remote work?",
+        "What is the maximum operating temperature in the spec sheet?",
+        "Give me the main points of the slides.",
+        "Who are the parties named in the lease?",
+        "What does the resume say about their work experience?",
+    ],
+}
+
+
+class QueryRouter:
+    """
+    Classifies queries as 'NORMAL' or 'RETRIEVAL' without an LLM call.
+
+    Every label is represented by the normalised centroid of its embedded examples.
+    A query goes to the label whose centroid has the highest cosine similarity with
+    the query embedding, and the difference between both similarities is the confidence.
+    The examples are embedded once per process, and again when a re-embedding migration
+    switches the embedder of the RAG collection, which the queries are embedded with.
+    """
+
+    def __init__(self, examples: Dict[QueryType, List[str]]) -> None:
+        self.examples = examples
+        self.labels: List[QueryType] = list(examples)
+        self.centroids: np.ndarray | None = None
+        self.embedder: Embedder | None = None
+        self.lock = asyncio.Lock()
+
+    async def warm_up(self, embedder: Embedder | None = None) -> None:
+        """
+        Embeds the labelled examples and computes the label centroids, with the
+        embedder of the RAG collection unless one is given.
+        """
+
+        async with self.lock:
+            if embedder is None:
+                embedder = await embedder_service.get_rag_embedder_async()
+            if self.centroids is not None and self.embedder is embedder:
+                return
+
+            try:
+                centroids = []
+                for label in self.labels:
+                    vectors = np.asarray(
+                        await embedder.aembed_documents(self.examples[label]),
+                        dtype=np.float32,
+                    )
+                    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+                    centroid = vectors.mean(axis=0)
+                    centroids.append(centroid / np.linalg.norm(centroid))
+
+                self.centroids = np.stack(centroids)
+                self.embedder = embedder
+            except Exception as e:
+                print(f"Query router warm up failed: {str(e)}")
+                return
+
+        print(f"Query router ready with {sum(map(len, self.examples.values()))} examples.")
+
+    async def route(self, query_embedding: List[float]) -> Tuple[QueryType, float]:
+        """
+        Returns the label closest to the query embedding along with the margin of its
+        cosine similarity over the other label's.
+        """
+
+        embedder = await embedder_service.get_rag_embedder_async()
+        if self.centroids is None or self.embedder is not embedder:
+            await self.warm_up(embedder)
+        # Without centroids of the query's embedder, the query is routed with zero confidence.
+        if self.centroids is None or self.embedder is not embedder:
+            return "NORMAL", 0.0
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        similarities = self.centroids @ (query / np.linalg.norm(query))
+
+        best, runner_up = np.argsort(similarities)[::-1][:2]
+        return self.labels[best], float(similarities[best] - similarities[runner_up])
+
+
+query_router = QueryRouter(ROUTER_EXAMPLES)
@@ -1,9 +1,11 @@
+import hashlib
 import os
-from typing import List, Iterator
+from typing import Dict, List, Iterator
 from langchain_core.documents import Document
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from ..models.ingestion import ChunkingJob
+from ..core.utils import get_document_id
+from ..models.ingestion import ChunkingJob, DocumentVersion
 from ..services.pubsub_service import publish_ingestion_failure
 from ..db.s3 import s3_client
 from ..services.batch_tracking_service import (
@@ -11,6 +13,7 @@ from ..services.batch_tracking_service import (
     check_ingestion_failure,
 )
 from ..services.queue_service import queue_service
+from .embedding_worker import publish_batch_progress
 
 FILES_DIR = "/tmp/ragscale_downloads"
 os.makedirs(FILES_DIR, exist_ok=True)
@@ -41,15 +44,25 @@ def load_file(
     try:
 
         loader = PyPDFLoader(path)
+        file_name = object_key.split("/", 1)[-1]
+        document_id = get_document_id(user_id, file_name)
 
-        # Store user_id and batch_id in metadata for proper retrieval.
+        # Store user_id, batch_id and document_id in metadata for proper retrieval and deletion.
+        # The page hash lets a re-upload of the document skip unchanged pages.
         for doc in loader.lazy_load():
             doc.metadata["user_id"] = user_id
             doc.metadata["batch_id"] = batch_id
+            doc.metadata["document_id"] = document_id
+            doc.metadata["file_name"] = file_name
+            doc.metadata["page_hash"] = hashlib.sha256(
+                doc.page_content.encode("utf-8")
+            ).hexdigest()
             yield doc
 
     except Exception as e:
+        # A partially read file would make its remaining pages look removed.
         print("Error streaming files from disk: ", e)
+        raise e
     finally:
         if os.path.exists(path):
             os.remove(path)
@@ -60,7 +73,10 @@ def split_file(docs: List[Document]) -> List[Document]:
     This function accepts a list of Documents and splits the documents into chunks.
     """
 
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=400)
+    # The start offsets let the context assembler merge overlapping hits.
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000, chunk_overlap=400, add_start_index=True
+    )
 
     print("Splitting document into chunks.")
 
@@ -108,6 +124,10 @@ def chunk_pdf(data: ChunkingJob) -> None:
     This function loads the PDF, chunks it, and offloads them into embedding
     queue for generating vector embeddings.
 
+    If the same file was ingested before, only pages whose content hash changed or
+    that are new are chunked. The new version of the document is recorded on the
+    batch and replaces the previous one once the batch succeeds.
+
     This function accepts the following parameters:
     - user_id: ID of the user.
     - batch_id: ID of the batch.
@@ -130,7 +150,21 @@ def chunk_pdf(data: ChunkingJob) -> None:
         BATCH_SIZE = 16
         docs: List[Document] = []
 
+        # Hashes of the pages of the previous upload of this document, if any.
+        document_id = get_document_id(user_id, object_key.split("/", 1)[-1])
+        previous_hashes = batch_tracking_service.get_page_hashes(document_id)
+        page_hashes: Dict[int, str] = {}
+        unchanged_pages: List[int] = []
+
         for doc in load_file(user_id, batch_id, object_key, bucket_name):
+            page = doc.metadata["page"]
+            page_hashes[page] = doc.metadata["page_hash"]
+
+            # Unchanged pages keep their vectors, so they are not chunked again.
+            if previous_hashes.get(page) == doc.metadata["page_hash"]:
+                unchanged_pages.append(page)
+                continue
+
             docs.append(doc)
 
             if len(docs) >= BATCH_SIZE:
@@ -140,13 +174,30 @@ def chunk_pdf(data: ChunkingJob) -> None:
                 
         if docs:
             chunks = split_file(docs)
-            offload_chunks(user_id, batch_id, docs)
+            offload_chunks(user_id, batch_id, chunks)
+
+        if previous_hashes:
+            print(
+                f"Re-ingested document {document_id}: {len(page_hashes) - len(unchanged_pages)} "
+                f"pages changed or new, {len(unchanged_pages)} unchanged."
+            )
+
+        batch_tracking_service.set_document_version(
+            batch_id,
+            document_id,
+            DocumentVersion(page_hashes=page_hashes, unchanged_pages=unchanged_pages),
+        )
+        batch_tracking_service.add_batch_document(batch_id, document_id)
 
         # Since chunking worker processes one file at a time, we
         # increment the value for files_chunked once whole process is over.
         batch_tracking_service.increment_field(
             batch_id=batch_id, field="files_chunked", delta=1
         )
+
+        # The embedding jobs may have finished before this file was counted as chunked,
+        # and a file with no changed pages enqueues none at all.
+        publish_batch_progress(user_id, batch_id)
     except Exception as e:
         print(f"Error while chunking PDF: {str(e)}")
 
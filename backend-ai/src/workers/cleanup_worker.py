@@ -1,5 +1,12 @@
+from typing import Callable
+from qdrant_client.models import FieldCondition, Filter, MatchAny, MatchValue
+from ..core.config import env_config
+from ..db.chunk_store import chunk_store
+from ..db.qdrant import qdrant_service
 from ..db.s3 import s3_client
-from ..models.ingestion import CleanupJob
+from ..models.ingestion import CleanupJob, DeletionJob, ProgressState
+from ..services.batch_tracking_service import batch_tracking_service
+from ..services.pubsub_service import pubsub_service
 
 
 def cleanup_s3_batch(data: CleanupJob):
@@ -14,3 +21,184 @@ def cleanup_s3_batch(data: CleanupJob):
         print(f"Cleaned up S3 objects for batch {batch_id}")
     except Exception as e:
         print(f"Error during S3 cleanup for batch {batch_id}: {e}")
+
+
+def delete_chunks(
+    points_filter: Filter, on_progress: Callable[[int], None] | None = None
+) -> None:
+    """
+    Deletes the points matching the filter with a single filtered delete, along with
+    their chunk texts in 'external' payload mode. Points already copied by a running
+    re-embedding migration are deleted too, so they don't come back after the flip.
+
+    This function accepts the following parameters:
+    - points_filter: Filter on the indexed payload fields.
+    - on_progress: Called with the number of chunk texts deleted so far.
+    """
+
+    collection = env_config.RAG_COLLECTION_NAME
+
+    # The chunk texts are looked up by point ID, so they go before the points.
+    if env_config.RAG_PAYLOAD_MODE == "external":
+        deleted = 0
+        for ids in qdrant_service.scroll_ids(collection, points_filter):
+            chunk_store.delete_many(ids)
+            deleted += len(ids)
+            if on_progress is not None:
+                on_progress(deleted)
+
+    qdrant_service.delete_points(collection, points_filter)
+
+    migration = batch_tracking_service.get_active_migration()
+    if migration is not None:
+        qdrant_service.delete_points(migration.collection, points_filter)
+
+
+def replace_previous_versions(user_id: str, batch_id: str) -> None:
+    """
+    Replaces the earlier versions of the batch's documents with the new ones. This runs
+    once the batch succeeded, so the old pages stay searchable until their new chunks
+    are embedded, and for good if the batch fails.
+
+    Vectors of unchanged pages are moved to this batch, and every other vector of the
+    document from another batch is deleted, including those left by a failed upload.
+    The page hashes are stored last, so the next upload is diffed against a version
+    whose vectors exist.
+
+    This function accepts the following parameters:
+    - user_id: ID of the user.
+    - batch_id: ID of the batch.
+    """
+
+    collections = [env_config.RAG_COLLECTION_NAME]
+    migration = batch_tracking_service.get_active_migration()
+    if migration is not None:
+        collections.append(migration.collection)
+
+    for document_id, version in batch_tracking_service.get_document_versions(batch_id).items():
+        document_filter = [
+            FieldCondition(key="metadata.user_id", match=MatchValue(value=user_id)),
+            FieldCondition(key="metadata.document_id", match=MatchValue(value=document_id)),
+        ]
+
+        if version.unchanged_pages:
+            for collection in collections:
+                qdrant_service.set_metadata(
+                    collection,
+                    Filter(
+                        must=[
+                            *document_filter,
+                            FieldCondition(
+                                key="metadata.page",
+                                match=MatchAny(any=version.unchanged_pages),
+                            ),
+                        ]
+                    ),
+                    {"batch_id": batch_id},
+                )
+
+        delete_chunks(
+            Filter(
+                must=document_filter,
+                must_not=[
+                    FieldCondition(key="metadata.batch_id", match=MatchValue(value=batch_id))
+                ],
+            )
+        )
+
+        batch_tracking_service.set_page_hashes(document_id, version.page_hashes)
+
+    batch_tracking_service.clear_document_versions(batch_id)
+
+
+def purge_vectors(data: DeletionJob) -> None:
+    """
+    Deletes all vectors of a user's batch or document with a single filtered delete on
+    the indexed payload fields, along with their chunk texts and uploaded files.
+    The progress is tracked in the batch hash and published like an ingestion batch.
+    """
+
+    collection = env_config.RAG_COLLECTION_NAME
+    points_filter = Filter(
+        must=[
+            FieldCondition(key="metadata.user_id", match=MatchValue(value=data.user_id)),
+            FieldCondition(key=f"metadata.{data.field}", match=MatchValue(value=data.value)),
+        ]
+    )
+
+    if not qdrant_service.client:
+        qdrant_service.connect()
+    client = qdrant_service.client
+    assert client is not None
+
+    try:
+        total = client.count(
+            collection_name=collection, count_filter=points_filter, exact=True
+        ).count
+        batch_tracking_service.increment_field(
+            batch_id=data.batch_id, field="total_chunks", delta=total
+        )
+        batch_tracking_service.increment_field(
+            batch_id=data.batch_id, field="files_chunked", delta=1
+        )
+        print(f"Deleting {total} chunks with {data.field} {data.value}.")
+
+        def report_progress(deleted: int) -> None:
+            pubsub_service.publish(
+                channel=f"status:{data.batch_id}",
+                data=ProgressState(
+                    user_id=data.user_id,
+                    status="PENDING",
+                    progress=min(int((deleted / total) * 100), 99) if total > 0 else 0,
+                    details=f"{deleted} out of {total} chunk texts deleted.",
+                ),
+            )
+
+        delete_chunks(points_filter, on_progress=report_progress)
+
+        # Drop the page hashes, so that re-uploading a deleted document ingests it in full.
+        # The S3 keys of a batch don't carry the user, so its files are only deleted if
+        # the batch is tracked as the user's.
+        if data.field == "batch_id":
+            batch = batch_tracking_service.get_batch_status(batch_id=data.value)
+            if batch is not None and batch.user_id == data.user_id:
+                batch_tracking_service.delete_page_hashes(
+                    batch_tracking_service.get_batch_documents(data.value)
+                )
+                s3_client.delete_batch(batch_id=data.value, bucket="ragscale-uploads")
+            else:
+                print(f"Batch {data.value} is not tracked for user {data.user_id}. Its files are kept.")
+        else:
+            batch_tracking_service.delete_page_hashes([data.value])
+
+        batch_tracking_service.increment_field(
+            batch_id=data.batch_id, field="chunks_embedded", delta=total
+        )
+        batch_tracking_service.update_status(batch_id=data.batch_id, status="SUCCESS")
+        batch_tracking_service.bump_docset_version(user_id=data.user_id)
+        print(f"Deleted {total} chunks with {data.field} {data.value}.")
+
+        pubsub_service.publish(
+            channel=f"status:{data.batch_id}",
+            data=ProgressState(
+                user_id=data.user_id,
+                status="SUCCESS",
+                progress=100,
+                details=f"Deleted {total} chunks.",
+            ),
+        )
+    except Exception as e:
+        print(f"Error while deleting chunks with {data.field} {data.value}: {str(e)}")
+
+        batch_tracking_service.update_status(batch_id=data.batch_id, status="FAILED")
+        pubsub_service.publish(
+            channel=f"status:{data.batch_id}",
+            data=ProgressState(
+                user_id=data.user_id,
+                status="FAILED",
+                progress=0,
+                details="Failed to delete the document(s). Please try again later.",
+            ),
+        )
+
+        raise e
@@ -1,11 +1,17 @@
-from langchain_ollama import OllamaEmbeddings
-from langchain_qdrant import QdrantVectorStore
+from typing import List
+from uuid import uuid4
+from qdrant_client.models import PointStruct
 from langchain_core.documents import Document
 from ..core.config import env_config
+from ..core.embedder import Embedder, load_embedder
+from ..db.chunk_store import chunk_store
+from ..db.qdrant import build_payload, build_vector, qdrant_service
 from ..services.pubsub_service import pubsub_service, publish_ingestion_failure
 from ..services.batch_tracking_service import batch_tracking_service, check_ingestion_failure
+from ..services.embedder_service import embedder_service
 from ..services.queue_service import queue_service
 from ..models.ingestion import EmbeddingJob, ProgressState
+from .cleanup_worker import replace_previous_versions
 
 
 def process_chunks(data: EmbeddingJob) -> None:
@@ -18,22 +24,38 @@ def process_chunks(data: EmbeddingJob) -> None:
         return
 
     try:
-        embeddings = OllamaEmbeddings(
-            model=env_config.EMBEDDER_MODEL, base_url="http://localhost:11434"
-        )
-
         # Convert payloads back to Documents
         documents = [
             Document(page_content=payload.text, metadata=payload.metadata)
             for payload in data.payload
         ]
 
-        QdrantVectorStore.from_documents(
-            documents=documents,
-            embedding=embeddings,
-            url="http://localhost:6333",
-            collection_name=env_config.RAG_COLLECTION_NAME,
-        )
+        ids = [str(uuid4()) for _ in documents]
+
+        # The texts are stored before the points, so a search never hits a chunk without text.
+        if env_config.RAG_PAYLOAD_MODE == "external":
+            chunk_store.put_many(ids, documents)
+
+        # While a re-embedding migration runs, new chunks are written to its shadow
+        # collection too, with the same IDs, so they survive the alias flip. The marker is
+        # read before the embedder and the shadow collection is written last: if the alias
+        # flips in between, the vectors of the previous model are overwritten.
+        migration = batch_tracking_service.get_active_migration()
+
+        embedder = embedder_service.get_rag_embedder()
+        # A migration may be replacing a legacy collection with its alias, so the collection
+        # must not be recreated under the alias name meanwhile.
+        if migration is None:
+            qdrant_service.ensure_collection(env_config.RAG_COLLECTION_NAME, dims=embedder.dims)
+        store_embeddings(env_config.RAG_COLLECTION_NAME, embedder, ids, documents)
+
+        if migration is not None:
+            store_embeddings(
+                migration.collection,
+                load_embedder(migration.backend, migration.model, migration.dims),
+                ids,
+                documents,
+            )
 
         update_embedding_status(data.user_id, data.batch_id, len(data.payload))
     except ValueError as ve:
@@ -44,10 +66,50 @@ def process_chunks(data: EmbeddingJob) -> None:
         batch_tracking_service.update_status(
             batch_id=data.batch_id, status="FAILED"
         )
+        # Chunks upserted before the failure are searchable, so cached answers may be stale.
+        batch_tracking_service.bump_docset_version(user_id=data.user_id)
         publish_ingestion_failure(user_id=data.user_id, batch_id=data.batch_id)
         raise e
 
 
+def store_embeddings(
+    collection: str, embedder: Embedder, ids: List[str], documents: List[Document]
+) -> None:
+    """
+    This function embeds the documents in batches and upserts them into the given collection,
+    along with their BM25 sparse vectors if the collection has them.
+
+    This function accepts the following parameters:
+    - collection: Name of the Qdrant collection.
+    - embedder: Embedder for the collection's vectors.
+    - ids: Point IDs of the documents.
+    - documents: Document chunks to embed.
+    """
+
+    if not qdrant_service.client:
+        qdrant_service.connect()
+    if qdrant_service.client is not None:
+        sparse = qdrant_service.has_sparse_vectors(collection)
+
+        for i in range(0, len(documents), embedder.batch_size):
+            batch = documents[i : i + embedder.batch_size]
+            vectors = embedder.embed_batch([document.page_content for document in batch])
+
+            qdrant_service.client.upsert(
+                collection_name=collection,
+                points=[
+                    PointStruct(
+                        id=point_id,
+                        vector=build_vector(vector, document.page_content, sparse),
+                        payload=build_payload(document.page_content, document.metadata),
+                    )
+                    for point_id, vector, document in zip(
+                        ids[i : i + embedder.batch_size], vectors, batch
+                    )
+                ],
+            )
+
+
 def update_embedding_status(user_id: str, batch_id: str, n: int) -> None:
     """
     This function updates the batch tracking service with the number of chunks embedded.
@@ -64,6 +126,23 @@ def update_embedding_status(user_id: str, batch_id: str, n: int) -> None:
     )
     print("Batch status updated.")
 
+    publish_batch_progress(user_id, batch_id)
+
+
+def publish_batch_progress(user_id: str, batch_id: str) -> None:
+    """
+    This function checks the current status of the batch and publishes it. Once all files
+    are chunked and all chunks are embedded, the earlier versions of the batch's documents
+    are replaced and the batch is marked as SUCCESS.
+
+    It is called by both the chunking and the embedding worker, which may both see the
+    batch complete, so the SUCCESS transition is guarded by an atomic flag.
+
+    This function accepts the following parameters:
+    - user_id: ID of the user.
+    - batch_id: ID of the batch.
+    """
+
     # Check the current status of the batch.
     batch_status = batch_tracking_service.get_batch_status(batch_id=batch_id)
 
@@ -79,7 +158,18 @@ def update_embedding_status(user_id: str, batch_id: str, n: int) -> None:
         batch_status.chunks_embedded == batch_status.total_chunks
         and batch_status.files_chunked == batch_status.total_files
     ):
+        if not batch_tracking_service.mark_batch_completed(batch_id):
+            print(f"Batch {batch_id} was already completed by another worker.")
+            return
+
+        try:
+            replace_previous_versions(batch_status.user_id, batch_id)
+        except Exception as e:
+            # The previous version of the pages stays searchable next to the new one.
+            print(f"Error while replacing the previous versions of batch {batch_id}: {str(e)}")
+
         batch_tracking_service.update_status(batch_id=batch_id, status="SUCCESS")
+        batch_tracking_service.bump_docset_version(user_id=batch_status.user_id)
         print(f"All chunks embedded for batch {batch_id}. Batch marked as SUCCESS.")
 
         pubsub_service.publish(
@@ -0,0 +1,75 @@
+import asyncio
+from typing import Any, Coroutine, List, TypeVar
+import orjson
+from ..core.config import env_config
+from ..db.mem0 import mem0_client
+from ..models.chat import MemoryJob
+from ..services.batch_tracking_service import batch_tracking_service
+from ..services.queue_service import queue_service
+
+T = TypeVar("T")
+
+# The memory worker is a SimpleWorker, so every job runs in this process. The shared mem0
+# client, its lock and its async HTTP clients are bound to the event loop they were first
+# used on, so all jobs run on one long-lived loop instead of a new one per asyncio.run.
+event_loop: asyncio.AbstractEventLoop | None = None
+
+
+def run_async(coroutine: Coroutine[Any, Any, T]) -> T:
+    """
+    Runs a coroutine on the worker's event loop, creating the loop on first use.
+    """
+
+    global event_loop
+    if event_loop is None or event_loop.is_closed():
+        event_loop = asyncio.new_event_loop()
+
+    return event_loop.run_until_complete(coroutine)
+
+
+def extract_memories(data: MemoryJob) -> None:
+    """
+    This function extracts memories from the user's buffered conversation turns with a
+    single mem0 call, so chatty users cost one LLM extraction and one round of graph
+    writes per batch of turns instead of one per turn.
+
+    The pending flag is cleared before the turns are taken, so a turn arriving while
+    this job runs schedules the next job. If the extraction fails, the turns are put
+    back for the retry.
+    """
+
+    if not queue_service.queue_client:
+        queue_service.connect()
+    client = queue_service.queue_client
+    assert client is not None
+
+    turns_key = f"memory:turns:{data.user_id}"
+    client.delete(f"memory:pending:{data.user_id}")
+
+    pipeline = client.pipeline()
+    pipeline.lrange(turns_key, 0, env_config.MEMORY_COALESCE_MAX_TURNS - 1)
+    pipeline.ltrim(turns_key, env_config.MEMORY_COALESCE_MAX_TURNS, -1)
+    pipeline.llen(turns_key)
+    raw_turns, _, remaining = pipeline.execute()
+
+    if not raw_turns:
+        print(f"No conversation turns buffered for user {data.user_id}.")
+        return
+
+    # Turns beyond the maximum are extracted by a follow-up job right away.
+    if remaining and client.set(f"memory:pending:{data.user_id}", 1, nx=True):
+        queue_service.schedule_memory_job(user_id=data.user_id, delay=0)
+
+    messages: List = [message for turn in raw_turns for message in orjson.loads(turn)]
+
+    try:
+        print(f"Extracting memories from {len(raw_turns)} turns of user {data.user_id}.")
+        run_async(mem0_client.add_memories(user_id=data.user_id, messages=messages))
+    except Exception as e:
+        print(f"Error while extracting memories for user {data.user_id}: {str(e)}")
+
+        client.lpush(turns_key, *reversed(raw_turns))
+        raise e
+
+    # Invalidates the cached memory searches of the user.
+    batch_tracking_service.bump_memory_version(user_id=data.user_id)
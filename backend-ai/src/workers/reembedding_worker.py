@@ -0,0 +1,259 @@
+import argparse
+import asyncio
+import time
+from typing import List, Tuple
+from qdrant_client.models import PointStruct, Record
+from ..core.config import env_config
+from ..core.embedder import build_embedder
+from ..db.chunk_store import chunk_store
+from ..db.qdrant import build_vector, qdrant_service
+from ..models.ingestion import EmbedderDetails, MigrationDetails, ProgressState, ReembeddingJob
+from ..services.batch_tracking_service import batch_tracking_service
+from ..services.pubsub_service import pubsub_service
+from ..services.queue_service import queue_service
+
+# Migrations are not owned by a user, but they are tracked like an ingestion batch.
+MIGRATION_USER_ID = "system"
+
+
+def reembed_collection(data: ReembeddingJob) -> None:
+    """
+    This function re-embeds every chunk of the RAG collection into a shadow collection
+    and then atomically points the RAG collection alias to it.
+
+    Searches keep using the current collection until the flip. While the migration runs,
+    the embedding worker writes new chunks to both collections, so nothing is lost.
+    Right after the flip, the new embedder is recorded in Redis, which is where the API
+    and the workers look up the embedder of the RAG collection.
+    The progress is tracked in the batch hash and published like an ingestion batch.
+    The shadow collection always has the BM25 sparse vector, so this is also how
+    collections created before hybrid search get their sparse index.
+    """
+
+    alias = env_config.RAG_COLLECTION_NAME
+
+    if not qdrant_service.client:
+        qdrant_service.connect()
+    client = qdrant_service.client
+    assert client is not None
+
+    try:
+        source = qdrant_service.resolve_collection(alias)
+        embedder = build_embedder(data.backend, data.model, data.dims)
+
+        qdrant_service.create_collection(data.target_collection, dims=data.dims)
+        batch_tracking_service.set_active_migration(
+            MigrationDetails(
+                batch_id=data.batch_id,
+                backend=data.backend,
+                model=data.model,
+                dims=data.dims,
+                collection=data.target_collection,
+            )
+        )
+
+        total = client.count(collection_name=source, exact=True).count
+        batch_tracking_service.increment_field(
+            batch_id=data.batch_id, field="total_chunks", delta=total
+        )
+        batch_tracking_service.increment_field(
+            batch_id=data.batch_id, field="files_chunked", delta=1
+        )
+        print(f"Re-embedding {total} chunks from '{source}' into '{data.target_collection}'.")
+
+        started = time.monotonic()
+        processed = 0
+        skipped = 0
+        offset = None
+
+        while True:
+            points, offset = client.scroll(
+                collection_name=source,
+                limit=env_config.REEMBED_PAGE_SIZE,
+                offset=offset,
+                with_payload=True,
+                with_vectors=False,
+            )
+
+            if points:
+                loaded = load_texts(points)
+                skipped += len(points) - len(loaded)
+
+                if loaded:
+                    vectors = embedder.embed_documents([text for _, text in loaded])
+
+                    # Point IDs are kept so that chunks dual-written by the embedding
+                    # worker are overwritten instead of duplicated.
+                    client.upsert(
+                        collection_name=data.target_collection,
+                        points=[
+                            PointStruct(
+                                id=point.id,
+                                vector=build_vector(vector, text, sparse=True),
+                                payload=point.payload,
+                            )
+                            for (point, text), vector in zip(loaded, vectors)
+                        ],
+                    )
+
+                processed += len(points)
+                report_progress(data.batch_id, len(points), processed, total)
+                throttle(started, processed)
+
+            if offset is None:
+                break
+
+        if source == alias:
+            # Chunks without stored text were not copied, the rest must all be there.
+            qdrant_service.drop_legacy_collection(alias, data.target_collection, missing=skipped)
+        qdrant_service.point_alias(alias, data.target_collection)
+        # The migration marker is cleared only after the embedder is switched, so chunks
+        # embedded with the previous model in between are still written to the new
+        # collection with the new model as well.
+        batch_tracking_service.set_active_embedder(
+            EmbedderDetails(backend=data.backend, model=data.model, dims=data.dims)
+        )
+        batch_tracking_service.clear_active_migration()
+        previous = (
+            f"The previous collection '{source}' was kept for rollback."
+            if source != alias
+            else f"The legacy collection '{source}' was replaced by the alias."
+        )
+        missing = (
+            f"\n{skipped} chunks without stored text were left out." if skipped else ""
+        )
+        batch_tracking_service.update_status(batch_id=data.batch_id, status="SUCCESS")
+        print(f"Alias '{alias}' now points to '{data.target_collection}'.")
+
+        pubsub_service.publish(
+            channel=f"status:{data.batch_id}",
+            data=ProgressState(
+                user_id=MIGRATION_USER_ID,
+                status="SUCCESS",
+                progress=100,
+                details=f"Re-embedded {processed - skipped} chunks with {data.model}.\n'{alias}' now points to '{data.target_collection}'. {previous}{missing}",
+            ),
+        )
+    except Exception as e:
+        print(f"Error while re-embedding the collection: {str(e)}")
+
+        batch_tracking_service.clear_active_migration()
+        batch_tracking_service.update_status(batch_id=data.batch_id, status="FAILED")
+        pubsub_service.publish(
+            channel=f"status:{data.batch_id}",
+            data=ProgressState(
+                user_id=MIGRATION_USER_ID,
+                status="FAILED",
+                progress=0,
+                details=f"Re-embedding failed. Searches still use '{alias}'.",
+            ),
+        )
+
+        raise e
+
+
+def load_texts(points: List[Record]) -> List[Tuple[Record, str]]:
+    """
+    Returns the given points along with their chunk texts. Texts missing from the
+    payload ('external' payload mode) are batch-fetched from the chunk store.
+    Points whose text isn't stored anywhere can't be re-embedded and are left out.
+    """
+
+    texts = [(point.payload or {}).get("page_content") for point in points]
+
+    missing = [str(point.id) for point, text in zip(points, texts) if text is None]
+    if missing:
+        stored = chunk_store.get_many(missing)
+        for i, point in enumerate(points):
+            if texts[i] is None and str(point.id) in stored:
+                texts[i] = stored[str(point.id)].page_content
+
+    loaded = [(point, text) for point, text in zip(points, texts) if text is not None]
+    if len(loaded) < len(points):
+        skipped = [str(point.id) for point, text in zip(points, texts) if text is None]
+        print(f"Skipping {len(skipped)} points without stored text: {', '.join(skipped[:10])}")
+
+    return loaded
+
+
+def report_progress(batch_id: str, n: int, processed: int, total: int) -> None:
+    """
+    Updates the batch hash with the re-embedded chunks and publishes the progress.
+
+    This function accepts the following parameters:
+    - batch_id: ID of the migration batch.
+    - n: Number of chunks re-embedded in the last page.
+    - processed: Number of chunks re-embedded so far.
+    - total: Number of chunks in the source collection when the migration started.
+    """
+
+    batch_tracking_service.increment_field(
+        batch_id=batch_id, field="chunks_embedded", delta=n
+    )
+
+    # Chunks ingested during the migration are not part of the initial count.
+    progress = min(int((processed / total) * 100), 99) if total > 0 else 0
+
+    pubsub_service.publish(
+        channel=f"status:{batch_id}",
+        data=ProgressState(
+            user_id=MIGRATION_USER_ID,
+            status="PENDING",
+            progress=progress,
+            details=f"{processed} out of {total} chunks re-embedded.",
+        ),
+    )
+
+
+def throttle(started: float, processed: int) -> None:
+    """
+    Sleeps as long as needed to keep the job at REEMBED_MAX_POINTS_PER_SECOND,
+    leaving embedder and Qdrant capacity for live traffic.
+    """
+
+    rate = env_config.REEMBED_MAX_POINTS_PER_SECOND
+    if rate <= 0:
+        return
+
+    ahead = processed / rate - (time.monotonic() - started)
+    if ahead > 0:
+        time.sleep(ahead)
+
+
+def main() -> None:
+    """
+    Enqueues a re-embedding migration and prints the batch ID to track it with.
+    """
+
+    parser = argparse.ArgumentParser(
+        description="Re-embed the RAG collection with a new embedder model."
+    )
+    parser.add_argument("--model", required=True, help="New embedder model.")
+    parser.add_argument("--backend", default=env_config.EMBEDDER_BACKEND)
+    parser.add_argument("--dims", type=int, default=env_config.EMBEDDER_DIMS)
+    args = parser.parse_args()
+
+    active = batch_tracking_service.get_active_migration()
+    if active is not None:
+        print(f"Migration {active.batch_id} into '{active.collection}' is already running.")
+        return
+
+    batch_id = asyncio.run(
+        batch_tracking_service.create_batch(total_files=1, user_id=MIGRATION_USER_ID)
+    )
+    target_collection = f"{env_config.RAG_COLLECTION_NAME}_{batch_id[:8]}"
+
+    queue_service.enqueue_reembedding_job(
+        batch_id=batch_id,
+        backend=args.backend,
+        model=args.model,
+        dims=args.dims,
+        target_collection=target_collection,
+    )
+
+    print(f"Re-embedding job enqueued. Track it at /api/v1/ingest/status/{batch_id}.")
+    print("Once it succeeds, the API and the workers embed RAG queries and chunks with the new model.")
+
+
+if __name__ == "__main__":
+    main()